@@ -0,0 +1,90 @@
+# app/admin_identity.py
+#
+# In-process copy of the single admin account, so login and the reserved-name
+# checks do not query the admin table on every request.
+#
+# The cache is loaded at startup and republished by the admin write handlers.
+# Other workers notice the change through a version file: every lookup stats
+# ADMIN_VERSION_FILE (no query) and reloads from the database when its inode
+# or mtime has moved. ADMIN_CACHE_TTL bounds staleness where workers do not
+# share a filesystem.
+
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+
+from .cache import bump_version_file, file_version
+from .database import SessionLocal
+from .models import Admin
+from .storage import BASE_DIR
+
+ADMIN_VERSION_FILE = os.getenv("ADMIN_VERSION_FILE", os.path.join(BASE_DIR, ".admin_version"))
+ADMIN_CACHE_TTL = float(os.getenv("ADMIN_CACHE_TTL", "300"))
+
+
+class AdminIdentity(NamedTuple):
+    id: int
+    full_name: str
+    username: str
+    email: str
+    password: str  # Argon2 hash
+    username_lower: str
+    email_lower: str
+
+    @classmethod
+    def of(cls, admin: Admin) -> "AdminIdentity":
+        return cls(
+            admin.id, admin.full_name, admin.username, admin.email, admin.password,
+            admin.username.lower(), admin.email.lower(),
+        )
+
+    def reserves(self, username: str, email: str) -> bool:
+        """The admin's username and email are reserved, case-insensitively."""
+        return username.lower() == self.username_lower or email.lower() == self.email_lower
+
+
+class AdminIdentityCache:
+    def __init__(self, version_file: str = ADMIN_VERSION_FILE, ttl: float = ADMIN_CACHE_TTL):
+        self.version_file = version_file
+        self.ttl = ttl
+        self.reloads = 0
+        self._identity: Optional[AdminIdentity] = None
+        self._version = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[AdminIdentity]:
+        """The current admin, or None when there is none yet."""
+        if self._version == file_version(self.version_file) and time.monotonic() < self._expires_at:
+            return self._identity
+        return self.load()
+
+    def load(self) -> Optional[AdminIdentity]:
+        """Read the admin from the primary and cache it."""
+        with self._lock:
+            version = file_version(self.version_file)
+            db = SessionLocal()
+            try:
+                admin = db.execute(select(Admin).limit(1)).scalar()
+                identity = AdminIdentity.of(admin) if admin else None
+            finally:
+                db.close()
+            self._set(identity, version)
+            self.reloads += 1
+            return identity
+
+    def publish(self, identity: Optional[AdminIdentity]):
+        """Cache an admin this worker just wrote and tell the other workers to reload."""
+        with self._lock:
+            self._set(identity, bump_version_file(self.version_file))
+
+    def _set(self, identity, version):
+        self._identity = identity
+        self._version = version
+        self._expires_at = time.monotonic() + self.ttl
+
+
+admin_identity = AdminIdentityCache()
@@ -0,0 +1,174 @@
+# app/assets.py
+#
+# Fingerprinted, precompressed static assets.
+#
+# Site stylesheets and images are copied to static/dist under a name that
+# contains a hash of their content (header.css -> header.3f9a1c2b.css), with
+# gzip and brotli siblings for text assets. Templates resolve logical names
+# through asset_url(), and AssetStaticFiles serves those files with
+# Cache-Control: immutable, picking a precompressed sibling when the client
+# accepts it.
+#
+#   python -m app.assets   # build static/dist ahead of deploy
+
+import gzip
+import hashlib
+import os
+import shutil
+import stat
+import threading
+from mimetypes import guess_type
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+
+from .storage import BASE_DIR, UPLOAD_NAME_RE
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip siblings are always written
+    brotli = None
+
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+STATIC_URL = "/static"
+
+# Logical directories (relative to static/) that get fingerprinted
+ASSET_DIRS = ("css", "images")
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# (Content-Encoding, file suffix), in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def _fingerprint(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _publish(source: str, target: str):
+    """Copy one asset into dist with compressed siblings; no-op if already built."""
+    if os.path.exists(target):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(source, "rb") as f:
+        data = f.read()
+    if os.path.splitext(target)[1] in COMPRESSIBLE_EXTENSIONS:
+        _write_atomic(target + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write_atomic(target + ".br", brotli.compress(data, quality=11))
+    _write_atomic(target, data)
+
+def build_assets() -> dict:
+    """
+    Fingerprint every site asset into static/dist and return the manifest.
+
+    The manifest maps logical names ("css/header.css") to fingerprinted URLs.
+    Uploaded images are skipped: their names already are content hashes.
+    """
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        source_dir = os.path.join(STATIC_DIR, asset_dir)
+        if not os.path.isdir(source_dir):
+            continue
+        with os.scandir(source_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith(".") or UPLOAD_NAME_RE.match(entry.name):
+                    continue
+                stem, ext = os.path.splitext(entry.name)
+                hashed_name = f"{stem}.{_fingerprint(entry.path)}{ext}"
+                _publish(entry.path, os.path.join(DIST_DIR, asset_dir, hashed_name))
+                manifest[f"{asset_dir}/{entry.name}"] = f"{STATIC_URL}/dist/{asset_dir}/{hashed_name}"
+    return manifest
+
+def get_manifest() -> dict:
+    """Build the asset manifest once per process."""
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                _manifest = build_assets()
+    return _manifest
+
+def asset_url(name: str) -> str:
+    """Jinja helper: fingerprinted URL for a logical asset name like 'css/header.css'."""
+    return get_manifest().get(name, f"{STATIC_URL}/{name}")
+
+
+# -------------------------
+# Static file handler
+# -------------------------
+def _is_immutable(path: str) -> bool:
+    """Fingerprinted assets and content-addressed uploads never change."""
+    path = path.replace(os.sep, "/")
+    if path.startswith("dist/") or path.startswith("images/derived/"):
+        return True
+    return path.startswith("images/") and bool(UPLOAD_NAME_RE.match(path[len("images/"):]))
+
+def _accepted_encodings(scope) -> set:
+    header = Headers(scope=scope).get("accept-encoding", "")
+    accepted = set()
+    for part in header.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles that serves precompressed siblings and immutable cache headers."""
+
+    async def get_response(self, path: str, scope) -> FileResponse:
+        immutable = _is_immutable(path)
+        if immutable and scope["method"] in ("GET", "HEAD"):
+            accepted = _accepted_encodings(scope)
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    return FileResponse(
+                        full_path,
+                        stat_result=stat_result,
+                        media_type=guess_type(path)[0] or "text/plain",
+                        headers={
+                            "Content-Encoding": encoding,
+                            "Vary": "Accept-Encoding",
+                            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+                        },
+                    )
+
+        response = await super().get_response(path, scope)
+        if immutable:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            if os.path.splitext(path)[1] in COMPRESSIBLE_EXTENSIONS:
+                response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+if __name__ == "__main__":
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    built = build_assets()
+    print(f"Built {len(built)} asset(s) into {DIST_DIR}")
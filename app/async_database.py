@@ -0,0 +1,115 @@
+# app/async_database.py
+#
+# Optional async database path. The read-heavy routes listed in ASYNC_ROUTES
+# are served by `async def` handlers on an AsyncSession, so a request waiting
+# on the database holds no threadpool thread; every other route keeps the
+# sync Session from app/database.py.
+#
+#   ASYNC_ROUTES=levels,listings     # or "all"; unset keeps every route sync
+#
+# The async URL is derived from DATABASE_URL (postgresql -> asyncpg,
+# sqlite -> aiosqlite) unless ASYNC_DATABASE_URL is set. The engine is
+# created on first use, so the async drivers are only needed when enabled.
+
+import os
+from typing import FrozenSet
+
+from fastapi import Request
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .database import DATABASE_URL, InstrumentedQueuePool, engine_options
+from .replicas import read_replica_for
+
+# Route groups that can be switched to async handlers
+ASYNC_ROUTE_GROUPS = ("levels", "listings", "dashboard", "profile")
+
+
+def parse_async_routes(value: str) -> FrozenSet[str]:
+    groups = {group.strip() for group in value.split(",") if group.strip()}
+    if "all" in groups:
+        return frozenset(ASYNC_ROUTE_GROUPS)
+    unknown = groups.difference(ASYNC_ROUTE_GROUPS)
+    if unknown:
+        raise ValueError(f"Unknown ASYNC_ROUTES group(s): {', '.join(sorted(unknown))}")
+    return frozenset(groups)
+
+ASYNC_ROUTES = parse_async_routes(os.getenv("ASYNC_ROUTES", ""))
+
+
+def async_url(url: str) -> str:
+    """The async-driver form of a sync database URL."""
+    for prefix, driver in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("sqlite+pysqlite://", "sqlite+aiosqlite://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(prefix):
+            return driver + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """The async engine's pool, feeding the same checkout metrics."""
+
+
+def async_engine_options(url: str) -> dict:
+    options = engine_options(url)
+    if options.get("poolclass") is InstrumentedQueuePool:
+        options["poolclass"] = InstrumentedAsyncQueuePool
+    connect_args = options.get("connect_args", {})
+    if "options" in connect_args:
+        # asyncpg takes server settings instead of a libpq options string
+        setting = connect_args.pop("options").split("=", 1)[1]
+        connect_args["server_settings"] = {"statement_timeout": setting}
+    return options
+
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """The process-wide AsyncEngine, created on first use."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **async_engine_options(ASYNC_DATABASE_URL))
+        # Handlers render templates after the session is done with the rows
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def new_async_session(**kwargs):
+    get_async_engine()
+    return _async_session_factory(**kwargs)
+
+
+async def get_async_db(request: Request):
+    """Async counterpart of get_db: one AsyncSession per request, on a read replica when routed to one."""
+    replica = read_replica_for(request)
+    kwargs = {"bind": replica.async_engine} if replica is not None else {}
+    # Like LazySession, the AsyncSession only checks out a connection on its first query
+    async with new_async_session(**kwargs) as db:
+        yield db
+
+
+def _discard_inherited_connections():
+    # See app/database.py; disposing the sync_engine swaps the pool without awaiting
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_discard_inherited_connections)
+
+
+async def dispose_async_engine():
+    """Close the async engine's connections (on shutdown)."""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_session_factory = None
@@ -0,0 +1,108 @@
+# app/attempts.py
+#
+# Write-behind recording of quiz attempts. Graded answers are buffered in
+# memory and a background thread writes them with multi-row INSERTs when the
+# buffer reaches ATTEMPT_FLUSH_ROWS or every ATTEMPT_FLUSH_SECONDS, so a whole
+# class submitting at once costs a handful of round-trips.
+
+import os
+import threading
+from typing import List
+
+from sqlalchemy import insert
+
+from .database import SessionLocal
+from .models import QuizAttempt
+
+ATTEMPT_FLUSH_ROWS = int(os.getenv("ATTEMPT_FLUSH_ROWS", "500"))
+ATTEMPT_FLUSH_SECONDS = float(os.getenv("ATTEMPT_FLUSH_SECONDS", "2"))
+# Rows kept across failed flushes before new ones are dropped
+ATTEMPT_MAX_PENDING = int(os.getenv("ATTEMPT_MAX_PENDING", "50000"))
+
+
+class AttemptBuffer:
+    def __init__(
+        self,
+        flush_rows: int = ATTEMPT_FLUSH_ROWS,
+        flush_seconds: float = ATTEMPT_FLUSH_SECONDS,
+        max_pending: int = ATTEMPT_MAX_PENDING,
+    ):
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._rows: List[dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def add(self, rows: List[dict]):
+        """Queue attempt rows; never touches the database on the caller's thread."""
+        with self._lock:
+            room = self.max_pending - len(self._rows)
+            if room < len(rows):
+                self.dropped += len(rows) - max(room, 0)
+                rows = rows[:max(room, 0)]
+            self._rows.extend(rows)
+            pending = len(self._rows)
+        if pending >= self.flush_rows:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self) -> int:
+        """Write every buffered row in one transaction. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            db = SessionLocal()
+            try:
+                # Core insert on the table: rows are sent as one executemany
+                # (multi-row VALUES batches), not grouped per ORM None pattern
+                statement = insert(QuizAttempt.__table__)
+                for start in range(0, len(rows), self.flush_rows):
+                    db.execute(statement, rows[start:start + self.flush_rows])
+                db.commit()
+                return len(rows)
+            except Exception as e:
+                db.rollback()
+                print(f"Error flushing {len(rows)} quiz attempts: {e}")
+                # Put the rows back ahead of those queued meanwhile so the next
+                # flush retries them; the newest rows beyond the bound are dropped
+                with self._lock:
+                    combined = rows + self._rows
+                    self.dropped += max(len(combined) - self.max_pending, 0)
+                    self._rows = combined[:self.max_pending]
+                return 0
+            finally:
+                db.close()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="attempt-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flusher thread and write whatever is still buffered."""
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+attempt_buffer = AttemptBuffer()
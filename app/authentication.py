@@ -1,12 +1,71 @@
 # app/auth.py
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
+# Argon2 cost parameters (defaults match passlib's). Hashes created with other
+# parameters still verify and are transparently rehashed on the next login.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "102400"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "8"))
+
 # Use Argon2 for password hashing (better than bcrypt for long passwords)
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
+
+
+# -------------------------
+# Dedicated hashing pool
+# -------------------------
+# Argon2 releases the GIL while hashing, so a small thread pool gives real
+# parallelism while capping how many hashes run at once. The (sync) routes
+# wait for the result in their threadpool thread, so neither the hash nor
+# their database work runs on the event loop.
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_POOL_SIZE, thread_name_prefix="argon2")
+_hash_slots = threading.BoundedSemaphore(HASH_POOL_SIZE + HASH_QUEUE_LIMIT)
+
+
+class HashingPoolBusy(Exception):
+    """Raised when every worker is busy and the hashing queue is full."""
+
+
+def _run_in_hash_pool(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HashingPoolBusy()
+    try:
+        future = _hash_executor.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future.result()
+
+def hash_password_pooled(password: str) -> str:
+    return _run_in_hash_pool(pwd_context.hash, password)
+
+def verify_password_pooled(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the hashing pool.
+
+    Returns (ok, new_hash); new_hash is set when the stored hash was made with
+    outdated Argon2 parameters and should replace it.
+    """
+    return _run_in_hash_pool(pwd_context.verify_and_update, plain, hashed)
@@ -0,0 +1,255 @@
+# app/availability.py
+#
+# Username/email availability for the live checks on the register and
+# profile forms (/api/availability).
+#
+# Every username and email in use is kept, lowercased, in a counting Bloom
+# filter. A miss means the name is definitely free and is answered without a
+# query; only possible hits go to the database (an indexed lower() lookup),
+# and possible hits the database reports free are the filter's false
+# positives, exposed on /metrics.
+#
+# The filter is built at startup and updated by the register, profile
+# update and user update/delete handlers of this worker. A background thread
+# adds users created by other workers every AVAILABILITY_REFRESH_SECONDS and
+# rebuilds the whole filter every AVAILABILITY_REBUILD_SECONDS (renames and
+# deletes elsewhere). Counters are only decremented for names this worker
+# added itself: removing a name the filter may not hold would clear slots
+# other names share, so such removals trigger a rebuild on the next refresh
+# instead. The form post itself still checks the database, so a stale "free"
+# answer can never create a duplicate.
+
+import hashlib
+import math
+import os
+import threading
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select
+
+from .database import SessionLocal
+from .models import User
+
+AVAILABILITY_FP_RATE = float(os.getenv("AVAILABILITY_FP_RATE", "0.01"))
+AVAILABILITY_MIN_CAPACITY = int(os.getenv("AVAILABILITY_MIN_CAPACITY", "10000"))
+AVAILABILITY_REFRESH_SECONDS = float(os.getenv("AVAILABILITY_REFRESH_SECONDS", "5"))
+AVAILABILITY_REBUILD_SECONDS = float(os.getenv("AVAILABILITY_REBUILD_SECONDS", "600"))
+
+FIELDS = ("username", "email")
+
+
+class CountingBloomFilter:
+    """
+    Bloom filter with one byte counter per slot, so items can be removed.
+    Counters saturate at 255 and are then never decremented.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float = AVAILABILITY_FP_RATE):
+        self.capacity = max(capacity, 1)
+        self.fp_rate = fp_rate
+        self.size = max(int(-self.capacity * math.log(fp_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.count = 0
+        self._counters = bytearray(self.size)
+
+    def _slots(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        # Double hashing: k slots from two 64-bit hashes
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        counters = self._counters
+        for slot in self._slots(key):
+            if counters[slot] < 255:
+                counters[slot] += 1
+        self.count += 1
+
+    def remove(self, key: str):
+        counters = self._counters
+        slots = self._slots(key)
+        if not all(counters[slot] for slot in slots):
+            return
+        for slot in slots:
+            if 0 < counters[slot] < 255:
+                counters[slot] -= 1
+        self.count = max(self.count - 1, 0)
+
+    def __contains__(self, key: str) -> bool:
+        counters = self._counters
+        return all(counters[slot] for slot in self._slots(key))
+
+    def estimated_fp_rate(self) -> float:
+        """(1 - e^(-kn/m))^k for the items currently in the filter."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+def _key(field: str, value: str) -> str:
+    return f"{field}:{value.strip().lower()}"
+
+
+class AvailabilityIndex:
+    def __init__(self, fp_rate: float = AVAILABILITY_FP_RATE):
+        self.fp_rate = fp_rate
+        self.filter = CountingBloomFilter(AVAILABILITY_MIN_CAPACITY, fp_rate)
+        self.last_user_id = 0
+        self.ready = False
+        # user id -> (username, email) this worker added since the last rebuild
+        self._added = {}
+        self._stale = False  # a removal could not be applied; rebuild on the next refresh
+        # Outcomes of lookups, for /metrics
+        self.definitely_free = 0
+        self.confirmed_taken = 0
+        self.false_positives = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------------------------
+    # Building
+    # -------------------------
+    def rebuild(self):
+        """Load every username and email into a new filter sized for the table."""
+        db = SessionLocal()
+        try:
+            rows = db.execute(select(User.id, User.username, User.email)).all()
+        finally:
+            db.close()
+        # Twice the current items, so sign-ups do not overfill it before the next rebuild
+        capacity = max(AVAILABILITY_MIN_CAPACITY, 2 * len(FIELDS) * len(rows))
+        bloom = CountingBloomFilter(capacity, self.fp_rate)
+        for _, username, email in rows:
+            bloom.add(_key("username", username))
+            bloom.add(_key("email", email))
+        with self._lock:
+            self.filter = bloom
+            self.last_user_id = max((row[0] for row in rows), default=0)
+            self.ready = True
+            self._added.clear()
+            self._stale = False
+
+    def refresh(self):
+        """
+        Add users created since the last build or refresh (by any worker).
+        Users this worker already added count twice, which can only cause
+        false positives after they are removed, until the next rebuild.
+        """
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(User.id, User.username, User.email).where(User.id > self.last_user_id).order_by(User.id)
+            ).all()
+        finally:
+            db.close()
+        if rows:
+            self.add_users((username, email) for _, username, email in rows)
+            self.last_user_id = max(self.last_user_id, rows[-1][0])
+        # Past its sizing the false-positive rate climbs: start over larger
+        if self._stale or self.filter.count > self.filter.capacity:
+            self.rebuild()
+
+    def _run(self):
+        since_rebuild = 0.0
+        while not self._stop.wait(AVAILABILITY_REFRESH_SECONDS):
+            since_rebuild += AVAILABILITY_REFRESH_SECONDS
+            try:
+                if since_rebuild >= AVAILABILITY_REBUILD_SECONDS:
+                    since_rebuild = 0.0
+                    self.rebuild()
+                else:
+                    self.refresh()
+            except Exception as e:
+                print(f"Error refreshing the availability filter: {e}")
+
+    def start(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            # Until a build succeeds every lookup goes to the database
+            print(f"Error building the availability filter: {e}")
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="availability-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    # -------------------------
+    # Updates from the write handlers
+    # -------------------------
+    def add_users(self, users: Iterable[tuple]):
+        with self._lock:
+            for username, email in users:
+                self.filter.add(_key("username", username))
+                self.filter.add(_key("email", email))
+
+    def add_user(self, user_id: int, username: str, email: str):
+        """A user this worker created or renamed; it may later be removed exactly."""
+        with self._lock:
+            self.filter.add(_key("username", username))
+            self.filter.add(_key("email", email))
+            self._added[user_id] = (username, email)
+
+    def remove_user(self, user_id: int, username: str, email: str):
+        with self._lock:
+            if self._added.get(user_id) != (username, email):
+                # Not known to be in this filter (added by another worker,
+                # or renamed there since): decrementing could clear other names
+                self._stale = True
+                return
+            del self._added[user_id]
+            self.filter.remove(_key("username", username))
+            self.filter.remove(_key("email", email))
+
+    def replace_user(self, user_id: int, old: tuple, new: tuple):
+        if tuple(old) != tuple(new):
+            self.remove_user(user_id, *old)
+            self.add_user(user_id, *new)
+
+    # -------------------------
+    # Lookups
+    # -------------------------
+    def is_taken(self, db, field: str, value: str, exclude_user_id: Optional[int] = None) -> bool:
+        """Whether a user other than `exclude_user_id` has `value` (case-insensitive)."""
+        if self.ready and _key(field, value) not in self.filter:
+            self.definitely_free += 1
+            return False
+        column = User.username if field == "username" else User.email
+        # Served by the lower() indexes declared in app/models.py
+        statement = select(User.id).where(func.lower(column) == value.strip().lower())
+        matches = db.execute(statement.limit(2)).scalars().all()
+        if self.ready:
+            # A match on the caller's own account still means the filter was right
+            if matches:
+                self.confirmed_taken += 1
+            else:
+                self.false_positives += 1
+        return any(user_id != exclude_user_id for user_id in matches)
+
+    def observed_fp_rate(self) -> float:
+        """Share of free names the filter could not rule out."""
+        free = self.definitely_free + self.false_positives
+        return self.false_positives / free if free else 0.0
+
+    def series(self) -> dict:
+        """Gauges and counters for /metrics, as name -> (type, help, value)."""
+        return {
+            "availability_bloom_items": ("gauge", "Usernames and emails in the availability filter.", self.filter.count),
+            "availability_bloom_estimated_fp_rate": (
+                "gauge", "False-positive rate expected from the filter's fill.", round(self.filter.estimated_fp_rate(), 6),
+            ),
+            "availability_bloom_false_positive_rate": (
+                "gauge", "Observed share of free names that still needed a database lookup.", round(self.observed_fp_rate(), 6),
+            ),
+            "availability_definitely_free_total": ("counter", "Lookups answered by the filter alone.", self.definitely_free),
+            "availability_false_positives_total": ("counter", "Filter hits the database found free.", self.false_positives),
+            "availability_confirmed_taken_total": ("counter", "Filter hits the database confirmed taken.", self.confirmed_taken),
+        }
+
+
+availability = AvailabilityIndex()
@@ -0,0 +1,38 @@
+# app/backfill_images.py
+#
+# Generate the WebP width variants (see app/images.py) for images that are
+# already in static/images: uploads from before derivatives existed and the
+# site images. Existing variants are kept, so it is safe to re-run, e.g. on
+# every deploy or after changing IMAGE_WIDTHS.
+#
+#   python -m app.backfill_images             # every image
+#   python -m app.backfill_images logo.png    # only these
+#   python -m app.backfill_images --dry-run   # only list what is missing
+
+import argparse
+import os
+import time
+
+from .images import backfill_derivatives, derivative_name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate missing WebP variants of existing images.")
+    parser.add_argument("names", nargs="*", help="image file names in static/images (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="list missing variants without writing them")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = backfill_derivatives(args.names or None, dry_run=args.dry_run)
+
+    action = "Would write" if args.dry_run else "Wrote"
+    for name, widths in results.items():
+        stem = os.path.splitext(name)[0]
+        for width in widths:
+            print(f"{action} derived/{derivative_name(stem, width)}")
+    count = sum(len(widths) for widths in results.values())
+    print(f"{action} {count} variant(s) for {len(results)} image(s) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
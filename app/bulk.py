@@ -0,0 +1,303 @@
+# app/bulk.py
+#
+# Streaming bulk import/export of lessons and quizzes as CSV or JSONL.
+#
+# Imports read the uploaded file row by row, validate each row as it arrives
+# and insert valid rows in batches inside one transaction; any invalid row
+# (or a dry run) rolls the whole import back. Image columns may hold an
+# existing /static/ path or URL, or the name of a file inside an optional
+# images zip, which is stored through the content-addressed image store.
+# Exports stream the table in chunks and never hold it in memory.
+
+import codecs
+import csv
+import io
+import json
+import os
+import zipfile
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .images import schedule_derivatives
+from .models import Lesson, Quiz
+from .storage import IMAGES_URL, UploadBudget, UploadTooLarge, store_stream
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+MAX_IMPORT_IMAGE_BYTES = int(os.getenv("MAX_IMPORT_IMAGE_BYTES", str(500 * 1024 * 1024)))
+# Whole import request (data file plus images zip), checked by UploadSizeLimitMiddleware
+MAX_IMPORT_BODY_BYTES = int(os.getenv("MAX_IMPORT_BODY_BYTES", str(MAX_IMPORT_IMAGE_BYTES + 100 * 1024 * 1024)))
+MAX_IMPORT_ERRORS = 50
+
+
+class ContentSpec(NamedTuple):
+    model: type
+    fields: Tuple[str, ...]
+    required: Tuple[str, ...]
+    image_fields: Tuple[str, ...]
+    level_field: str
+    levels: Tuple[str, ...]
+
+
+LESSON_SPEC = ContentSpec(
+    model=Lesson,
+    fields=("sign_level", "name", "image", "heading", "description"),
+    required=("sign_level", "name", "image", "heading", "description"),
+    image_fields=("image",),
+    level_field="sign_level",
+    levels=("Basic", "Intermediate", "Advance"),
+)
+
+QUIZ_SPEC = ContentSpec(
+    model=Quiz,
+    fields=(
+        "level",
+        "question_text",
+        "question_image",
+        "option1_text",
+        "option2_text",
+        "option3_text",
+        "option4_text",
+        "option1_image",
+        "option2_image",
+        "option3_image",
+        "option4_image",
+        "correct_option",
+    ),
+    required=("level", "correct_option"),
+    image_fields=("question_image", "option1_image", "option2_image", "option3_image", "option4_image"),
+    level_field="level",
+    levels=("Beginner", "Intermediate", "Advance"),
+)
+
+
+class ImportResult:
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.valid = 0
+        self.inserted = 0
+        self.error_count = 0
+        self.errors: List[str] = []
+
+    def add_error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append(f"Line {line}: {message}")
+
+    @property
+    def summary(self) -> str:
+        if self.error_count:
+            return f"Import rejected: {self.error_count} invalid row(s) out of {self.rows}. Nothing was saved."
+        if self.dry_run:
+            return f"Dry run: all {self.rows} row(s) are valid. Nothing was saved."
+        return f"Imported {self.inserted} row(s)."
+
+
+# -------------------------
+# Reading
+# -------------------------
+def _is_jsonl(filename: Optional[str]) -> bool:
+    return (filename or "").lower().endswith((".jsonl", ".ndjson", ".json"))
+
+def iter_records(source, filename: Optional[str]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (line number, record, parse error) from a binary CSV or JSONL stream."""
+    lines = codecs.iterdecode(source, "utf-8-sig")
+    if _is_jsonl(filename):
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"invalid JSON ({e})"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "expected a JSON object"
+                continue
+            yield line_no, record, None
+    else:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record, None
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def validate_record(spec: ContentSpec, record: dict) -> Tuple[dict, List[str]]:
+    values = {field: _clean(record.get(field)) for field in spec.fields}
+    errors = [f"'{field}' is required" for field in spec.required if values[field] is None]
+
+    level = values[spec.level_field]
+    if level is not None and level not in spec.levels:
+        errors.append(f"'{spec.level_field}' must be one of {', '.join(spec.levels)}")
+
+    if "correct_option" in values and values["correct_option"] is not None:
+        try:
+            values["correct_option"] = int(values["correct_option"])
+        except ValueError:
+            values["correct_option"] = None
+        if values["correct_option"] not in (1, 2, 3, 4):
+            errors.append("'correct_option' must be 1-4")
+
+    return values, errors
+
+
+# -------------------------
+# Import
+# -------------------------
+def _unreadable(error: Exception) -> str:
+    """Message for an upload that could not be read to the end."""
+    if isinstance(error, UnicodeDecodeError):
+        return "the file is not UTF-8 text"
+    if isinstance(error, csv.Error):
+        return f"the file is not valid CSV ({error})"
+    return str(error)
+
+class _ImageResolver:
+    """Maps image column values to stored /static/images paths."""
+
+    def __init__(self, images_zip):
+        self.zip = zipfile.ZipFile(images_zip) if images_zip is not None else None
+        self.members = set(self.zip.namelist()) if self.zip else set()
+        self.stored = {}
+        self.created: List[str] = []
+        self.budget = UploadBudget(MAX_IMPORT_IMAGE_BYTES)
+
+    def check(self, value: str) -> Optional[str]:
+        if value.startswith(("/static/", "http://", "https://")):
+            return None
+        if self.zip is None:
+            return f"image '{value}' is not a /static/ path or URL and no images zip was uploaded"
+        if value not in self.members:
+            return f"image '{value}' is not in the images zip"
+        return None
+
+    def resolve(self, value: str) -> str:
+        if value.startswith(("/static/", "http://", "https://")):
+            return value
+        if value not in self.stored:
+            with self.zip.open(value) as member:
+                filename, created = store_stream(member, value, self.budget)
+            self.stored[value] = f"{IMAGES_URL}/{filename}"
+            if created:
+                self.created.append(self.stored[value])
+        return self.stored[value]
+
+def import_content(
+    db: Session,
+    spec: ContentSpec,
+    source,
+    filename: Optional[str],
+    images_zip=None,
+    dry_run: bool = False,
+) -> ImportResult:
+    """
+    Validate and insert every row of a CSV/JSONL stream in one transaction.
+
+    Rows are inserted in batches of IMPORT_BATCH_SIZE as they are read. The
+    transaction is committed only if every row is valid and this is not a
+    dry run; otherwise it is rolled back and nothing is saved.
+    """
+    result = ImportResult(dry_run)
+    table = spec.model.__table__
+    statement = insert(table)
+    batch = []
+    try:
+        images = _ImageResolver(images_zip)
+    except zipfile.BadZipFile:
+        result.add_error(0, "the images file is not a valid zip archive")
+        return result
+
+    try:
+        for line, record, parse_error in iter_records(source, filename):
+            result.rows += 1
+            if parse_error:
+                result.add_error(line, parse_error)
+                continue
+            values, errors = validate_record(spec, record)
+            for field in spec.image_fields:
+                if values[field] is not None:
+                    error = images.check(values[field])
+                    if error:
+                        errors.append(error)
+            if errors:
+                result.add_error(line, "; ".join(errors))
+                continue
+
+            result.valid += 1
+            if dry_run or result.error_count:
+                # Keep validating, but the import will be rolled back anyway
+                continue
+            for field in spec.image_fields:
+                if values[field] is not None:
+                    values[field] = images.resolve(values[field])
+            batch.append(values)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                db.execute(statement, batch)
+                result.inserted += len(batch)
+                batch = []
+
+        if dry_run or result.error_count:
+            db.rollback()
+            result.inserted = 0
+            return result
+
+        if batch:
+            db.execute(statement, batch)
+            result.inserted += len(batch)
+        db.commit()
+        schedule_derivatives(*images.created)
+        return result
+    except (UploadTooLarge, UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        result.inserted = 0
+        result.add_error(0, _unreadable(e))
+        return result
+    except BaseException:
+        db.rollback()
+        raise
+
+
+# -------------------------
+# Export
+# -------------------------
+def export_content(spec: ContentSpec, fmt: str = "csv") -> Iterator[str]:
+    """
+    Stream a whole table as CSV or JSONL, EXPORT_BATCH_SIZE rows at a time.
+
+    Opens its own session so it can outlive the request dependency while the
+    response body is being sent.
+    """
+    names = ("id",) + spec.fields
+    model = spec.model
+    statement = (
+        select(*(getattr(model, name) for name in names))
+        .order_by(model.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    db = SessionLocal()
+    try:
+        result = db.execute(statement)
+        if fmt == "jsonl":
+            for partition in result.partitions():
+                yield "".join(json.dumps(dict(zip(names, row))) + "\n" for row in partition)
+        else:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            for partition in result.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+    finally:
+        db.close()
@@ -0,0 +1,167 @@
+# app/cache.py
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from .storage import BASE_DIR
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache with a per-entry time-to-live.
+
+    Entries are evicted when they are older than `ttl` seconds or when the
+    cache grows beyond `maxsize` (least recently used first).
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for `key`, calling `loader()` on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# -------------------------
+# Version files
+# -------------------------
+# A change marker shared by every worker on the host: writers replace the
+# file, readers compare its inode and mtime (one stat, no query).
+def file_version(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def bump_version_file(path: str):
+    """Replace the version file and return its new version (None if it cannot be written)."""
+    # A new inode every time, so the change shows even within the mtime resolution
+    directory = os.path.dirname(path) or "."
+    temp_path = os.path.join(directory, f"{os.path.basename(path)}.{uuid.uuid4().hex}")
+    try:
+        with open(temp_path, "w") as f:
+            f.write(f"{time.time()}\n")
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Error writing version file {path}: {e}")
+        return None
+    return file_version(path)
+
+
+class SharedVersion:
+    """
+    A version shared by the workers on the host: this process's bump counter
+    plus the version of its file, so a bump in one worker is seen by every
+    other worker on its next lookup. Where workers do not share a filesystem
+    only the local counter moves and cache TTLs bound staleness.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = 0
+        self._lock = threading.Lock()
+
+    def current(self) -> tuple:
+        return (self._local, file_version(self.path))
+
+    def bump(self) -> tuple:
+        with self._lock:
+            self._local += 1
+            bump_version_file(self.path)
+            return self.current()
+
+
+# -------------------------
+# Content version
+# -------------------------
+# Lessons and quizzes only change through the admin write handlers, which call
+# bump_content_version(). Cache keys include the version, so a bump makes every
+# older entry unreachable and it ages out through LRU/TTL eviction.
+CONTENT_VERSION_FILE = os.getenv("CONTENT_VERSION_FILE", os.path.join(BASE_DIR, ".content_version"))
+_content_version = SharedVersion(CONTENT_VERSION_FILE)
+
+
+def content_version() -> tuple:
+    return _content_version.current()
+
+
+def bump_content_version() -> tuple:
+    return _content_version.bump()
+
+
+# Lesson writes (not quiz writes) also bump this one, which tells the search
+# index of every worker to check the lessons table
+LESSON_VERSION_FILE = os.getenv("LESSON_VERSION_FILE", os.path.join(BASE_DIR, ".lesson_version"))
+lesson_version = SharedVersion(LESSON_VERSION_FILE)
+
+# New image variants change no cached content (srcset looks them up by file
+# name), so they bump their own version, checked only by the srcset helper
+IMAGE_VERSION_FILE = os.getenv("IMAGE_VERSION_FILE", os.path.join(BASE_DIR, ".image_version"))
+image_version = SharedVersion(IMAGE_VERSION_FILE)
+
+
+# Per-level lesson and quiz result sets
+content_cache = TTLCache(
+    maxsize=int(os.getenv("CONTENT_CACHE_SIZE", "64")),
+    ttl=float(os.getenv("CONTENT_CACHE_TTL", "300")),
+)
+
+# Rendered public pages: (template, content version) -> (body, etag)
+page_cache = TTLCache(
+    maxsize=int(os.getenv("PAGE_CACHE_SIZE", "64")),
+    ttl=float(os.getenv("PAGE_CACHE_TTL", "600")),
+)
@@ -0,0 +1,48 @@
+# app/gc_images.py
+#
+# Remove uploaded images that no lesson or quiz references any more.
+#
+#   python -m app.gc_images            # delete orphaned uploads
+#   python -m app.gc_images --dry-run  # only list them
+
+import argparse
+import os
+
+from .database import SessionLocal
+from .images import remove_orphan_derivatives
+from .storage import IMAGES_DIR, collect_garbage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Garbage collect unreferenced uploaded images.")
+    parser.add_argument("--dry-run", action="store_true", help="list orphaned files without deleting them")
+    parser.add_argument(
+        "--grace",
+        type=float,
+        default=3600,
+        help="skip files modified within this many seconds (default: 3600)",
+    )
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        removed = collect_garbage(db, grace_seconds=args.grace, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    # Derivatives follow their source image
+    remaining = {
+        os.path.splitext(entry.name)[0]
+        for entry in os.scandir(IMAGES_DIR)
+        if entry.is_file() and entry.name not in removed
+    }
+    removed += remove_orphan_derivatives(remaining, dry_run=args.dry_run)
+
+    action = "Would remove" if args.dry_run else "Removed"
+    for name in removed:
+        print(f"{action} {name}")
+    print(f"{action} {len(removed)} file(s)")
+
+
+if __name__ == "__main__":
+    main()
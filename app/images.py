@@ -0,0 +1,188 @@
+# app/images.py
+#
+# Responsive derivatives for uploaded images: resized WebP variants written
+# next to the uploads, plus the Jinja helper that turns them into srcset.
+# Uploads get theirs in the background; images that predate that (and the
+# site images in the same directory) are covered by `python -m app.backfill_images`.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from markupsafe import Markup
+
+from .cache import TTLCache, image_version
+from .storage import IMAGES_DIR, IMAGES_URL
+
+try:
+    from PIL import ExifTags, Image, ImageOps
+except ImportError:  # Pillow is optional; without it pages use the originals
+    Image = None
+
+DERIVED_DIR = os.path.join(IMAGES_DIR, "derived")
+DERIVED_URL = f"{IMAGES_URL}/derived"
+DERIVATIVE_WIDTHS = tuple(
+    int(w) for w in os.getenv("IMAGE_WIDTHS", "128,256,512").split(",") if w.strip()
+)
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+
+os.makedirs(DERIVED_DIR, exist_ok=True)
+
+_derivative_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="derivatives")
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+# EXIF orientations that swap width and height (undone by exif_transpose)
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+# (filename, image version) -> srcset string; writing variants bumps the version
+_srcset_cache = TTLCache(maxsize=4096, ttl=600)
+
+
+def derivative_name(stem: str, width: int) -> str:
+    return f"{stem}-{width}w.webp"
+
+def generate_derivatives(filename: str) -> list:
+    """
+    Write WebP variants of IMAGES_DIR/filename for each configured width.
+
+    Widths at or above the original are skipped (no upscaling); the original
+    width is always written so srcset has a full-size modern-format entry.
+    Returns the widths written.
+    """
+    written = _write_derivatives(filename)
+    if written:
+        # Every worker's srcset lookups see the new variants
+        image_version.bump()
+    return written
+
+def _write_derivatives(filename: str) -> list:
+    if Image is None:
+        return []
+
+    stem = os.path.splitext(filename)[0]
+    written = []
+    with Image.open(os.path.join(IMAGES_DIR, filename)) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ("RGB", "RGBA"):
+            source = source.convert("RGBA")
+        for width in _variant_widths(source.width):
+            path = os.path.join(DERIVED_DIR, derivative_name(stem, width))
+            if os.path.exists(path):
+                continue
+            height = max(1, round(source.height * width / source.width))
+            variant = source if width == source.width else source.resize((width, height), Image.LANCZOS)
+            tmp_path = f"{path}.tmp"
+            variant.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+            os.replace(tmp_path, path)
+            written.append(width)
+    return written
+
+def _variant_widths(source_width: int) -> list:
+    return sorted({w for w in DERIVATIVE_WIDTHS if w < source_width} | {source_width})
+
+def backfill_derivatives(names=None, dry_run: bool = False) -> dict:
+    """
+    Write the missing variants of existing images in IMAGES_DIR (all of them,
+    or only `names`). Returns filename -> widths written (or missing, on a dry run).
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required to generate image derivatives")
+    if names is None:
+        names = sorted(
+            entry.name for entry in os.scandir(IMAGES_DIR)
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+        )
+    results = {}
+    for name in names:
+        try:
+            if dry_run:
+                stem = os.path.splitext(name)[0]
+                widths = [
+                    width for width in _variant_widths(_display_width(os.path.join(IMAGES_DIR, name)))
+                    if not os.path.exists(os.path.join(DERIVED_DIR, derivative_name(stem, width)))
+                ]
+            else:
+                widths = _write_derivatives(name)
+        except Exception as e:
+            print(f"Error generating derivatives for {name}: {e}")
+            continue
+        if widths:
+            results[name] = widths
+    if results and not dry_run:
+        # One bump for the whole run
+        image_version.bump()
+    return results
+
+def _generate_quietly(filename: str):
+    try:
+        generate_derivatives(filename)
+    except Exception as e:
+        print(f"Error generating derivatives for {filename}: {e}")
+
+def schedule_derivatives(*paths):
+    """Queue derivative generation for uploaded image paths (non-blocking)."""
+    if Image is None:
+        return
+    for path in paths:
+        if path and path.startswith(IMAGES_URL + "/"):
+            _derivative_executor.submit(_generate_quietly, os.path.basename(path))
+
+
+# -------------------------
+# Template helper
+# -------------------------
+def _display_width(source_path: str) -> int:
+    """Width of an image after EXIF rotation; reads the header only."""
+    with Image.open(source_path) as source:
+        width, height = source.size
+        # PNG getexif() decodes the whole file unless the EXIF chunk precedes the pixels
+        if source.format == "PNG" and "exif" not in source.info:
+            return width
+        if source.getexif().get(ExifTags.Base.Orientation) in _TRANSPOSED_ORIENTATIONS:
+            return height
+        return width
+
+def _srcset_for(filename: str) -> str:
+    """Probe the variant names this image would have (no directory listing)."""
+    stem = os.path.splitext(filename)[0]
+    widths = set(DERIVATIVE_WIDTHS)
+    if Image is not None:
+        try:
+            widths = set(_variant_widths(_display_width(os.path.join(IMAGES_DIR, filename))))
+        except (OSError, ValueError):
+            return ""
+    entries = []
+    for width in sorted(widths):
+        name = derivative_name(stem, width)
+        if os.path.exists(os.path.join(DERIVED_DIR, name)):
+            entries.append(f"{DERIVED_URL}/{name} {width}w")
+    return ", ".join(entries)
+
+def srcset(path, sizes: str = "100vw") -> Markup:
+    """
+    Jinja helper emitting ` srcset="..." sizes="..."` for an image in
+    IMAGES_DIR, given by URL or by its asset name ("images/people_sign.png").
+
+    Renders nothing when the image has no derivatives (not backfilled, Pillow
+    missing, or generation still pending), so the plain src is used.
+    """
+    if path and path.startswith("images/"):
+        path = f"{IMAGES_URL}/{path[len('images/'):]}"
+    if not path or not path.startswith(IMAGES_URL + "/"):
+        return Markup("")
+    filename = os.path.basename(path)
+    value = _srcset_cache.get_or_load((filename, image_version.current()), lambda: _srcset_for(filename))
+    if not value:
+        return Markup("")
+    return Markup(' srcset="%s" sizes="%s"') % (value, sizes)
+
+def remove_orphan_derivatives(keep_stems: set, dry_run: bool = False) -> list:
+    """Delete derivatives whose source image is not in `keep_stems`."""
+    removed = []
+    with os.scandir(DERIVED_DIR) as it:
+        for entry in it:
+            stem = entry.name.rsplit("-", 1)[0]
+            if entry.is_file() and stem not in keep_stems:
+                if not dry_run:
+                    os.remove(entry.path)
+                removed.append(f"derived/{entry.name}")
+    return removed
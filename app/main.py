@@ -1,129 +1,519 @@
 # app/main.py
 
 import os
+import hashlib
 import uuid
+from contextlib import asynccontextmanager
+from functools import partial
 from typing import Optional
 
 from fastapi import FastAPI, Request, Form, Depends, File, UploadFile
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import (
+    FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse,
+)
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.sessions import SessionMiddleware
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 
-from .database import SessionLocal
+from .database import SessionLocal, LazySession, engine, pool_series
+from .async_database import ASYNC_ROUTES, dispose_async_engine, get_async_db, get_async_engine, new_async_session
+from .replicas import read_replica_for, replicas
+from .admin_identity import AdminIdentity, admin_identity
+from .availability import availability
+from .search import SearchDocument, lesson_index
 from .models import User, Lesson, Quiz, Admin
-from .authentication import hash_password, verify_password
+from .authentication import (
+    hash_password,
+    hash_password_pooled,
+    verify_password_pooled,
+    HashingPoolBusy,
+)
+from .cache import content_cache, page_cache, content_version, bump_content_version, lesson_version
+from .storage import save_uploaded_file, save_uploaded_files, UploadSizeLimitMiddleware, UploadTooLarge
+from .images import schedule_derivatives, srcset
+from .assets import AssetStaticFiles, asset_url, get_manifest
+from .templating import PRODUCTION, create_templates, precompile_templates
+from .queries import (
+    lesson_cards, quiz_cards, lesson_rows_page, quiz_rows_page, user_rows_page, identity_taken,
+    lesson_cards_async, quiz_cards_async, lesson_rows_page_async, quiz_rows_page_async, user_rows_page_async,
+)
+from .stats import get_stats, get_stats_async, invalidate_stats
+from .attempts import attempt_buffer
+from .bulk import LESSON_SPEC, MAX_IMPORT_BODY_BYTES, QUIZ_SPEC, import_content, export_content
+from .metrics import MetricsMiddleware, instrument_engine, render_metrics
+from .profiling import ProfilingMiddleware, capture_file, list_captures
+from .query_budget import QUERY_BUDGETS, QueryBudgetMiddleware, query_budget
+from .query_budget import instrument_engine as instrument_budget_engine
+from .startup import ensure_schema, run_startup, wait_for_database, warm_pool
 
 # -------------------------
 # FastAPI app
 # -------------------------
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Blocking setup (retries, DDL, cache builds) runs off the event loop
+    await run_in_threadpool(run_startup, *startup_steps())
+    try:
+        yield
+    finally:
+        await run_in_threadpool(stop_background_work)
+        await replicas.dispose_async()
+        await dispose_async_engine()
+
+app = FastAPI(lifespan=lifespan)
+# Inside the session middleware, so ?profile=1 can be checked against the admin session
+app.add_middleware(ProfilingMiddleware)
 app.add_middleware(SessionMiddleware, secret_key="your-secret-key-change-in-production")
+# Bulk imports carry whole image sets, so they get a larger limit of their own
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path_limits={"/import_lessons": MAX_IMPORT_BODY_BYTES, "/import_quizzes": MAX_IMPORT_BODY_BYTES},
+)
+# Outermost, so the latency it records includes the session middleware
+app.add_middleware(MetricsMiddleware)
+if QUERY_BUDGETS:
+    app.add_middleware(QueryBudgetMiddleware, engine=engine)
+# Every engine a request can use; AsyncEngine statements run through its
+# sync_engine, which takes the same listeners
+db_engines = [engine] + replicas.engines(include_async=bool(ASYNC_ROUTES))
+if ASYNC_ROUTES:
+    db_engines.append(get_async_engine().sync_engine)
+for db_engine in db_engines:
+    instrument_engine(db_engine)
+    if QUERY_BUDGETS:
+        instrument_budget_engine(db_engine)
 
 # -------------------------
 # Paths for static and templates
 # -------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 STATIC_DIR = os.path.join(BASE_DIR, "static")
-IMAGES_DIR = os.path.join(STATIC_DIR, "images")
 TEMPLATES_DIR = os.path.join(BASE_DIR, "Frontend")
 
-# Create images directory if it doesn't exist
-os.makedirs(IMAGES_DIR, exist_ok=True)
+app.mount("/static", AssetStaticFiles(directory=STATIC_DIR), name="static")
+templates = create_templates(TEMPLATES_DIR)
+templates.env.globals["srcset"] = srcset
+templates.env.globals["asset_url"] = asset_url
+
+
+# -------------------------
+# Startup and shutdown (see app/startup.py)
+# -------------------------
+def warm_templates():
+    """Compile every template (and build the asset manifest) before the first request in production."""
+    if PRODUCTION:
+        get_manifest()
+        precompile_templates(templates)
+
+
+def warm_content_cache():
+    """Load the per-level lesson and quiz cards the public pages render from."""
+    db = SessionLocal()
+    try:
+        for level in ("Basic", "Intermediate", "Advance"):
+            get_level_lessons(db, level)
+        for level in ("Beginner", "Intermediate", "Advance"):
+            get_level_quizzes(db, level)
+    finally:
+        db.close()
+
+
+def startup_steps():
+    """(setup, warm-ups) for run_startup: setup runs in order and must succeed."""
+    setup = [
+        ("wait_for_database", partial(wait_for_database, engine)),
+        ("ensure_schema", partial(ensure_schema, engine)),
+        ("init_admin", init_admin),
+    ]
+    warmups = [
+        ("warm_pool", partial(warm_pool, engine)),
+        ("warm_templates", warm_templates),
+        ("warm_content_cache", warm_content_cache),
+        ("load_admin_identity", admin_identity.load),
+        ("build_availability_filter", availability.start),
+        ("load_search_index", lesson_index.start),
+        ("start_replica_health_checks", replicas.start),
+        ("start_attempt_flusher", attempt_buffer.start),
+    ]
+    return setup, warmups
+
+
+def stop_background_work():
+    # Buffered quiz attempts are written before the worker exits
+    attempt_buffer.stop()
+    replicas.stop()
+    availability.stop()
+    lesson_index.stop()
+
+
+@app.exception_handler(HashingPoolBusy)
+async def hashing_pool_busy_handler(request: Request, exc: HashingPoolBusy):
+    """Shed load quickly instead of queueing behind a login burst."""
+    return PlainTextResponse(
+        "Server is busy, please try again shortly.",
+        status_code=503,
+        headers={"Retry-After": "1"},
+    )
+
 
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large_handler(request: Request, exc: UploadTooLarge):
+    return PlainTextResponse(str(exc), status_code=413)
 
 
 # -------------------------
 # Initialize default admin if none exists
 # -------------------------
-def init_admin():
-    """Create default admin account if it doesn't exist."""
-    db = SessionLocal()
+def init_admin(db: Optional[Session] = None) -> Optional[Admin]:
+    """
+    Create default admin account if it doesn't exist and return it.
+
+    Uses `db` when called from a request so no second session is opened.
+    """
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
     try:
         admin = db.query(Admin).first()
         if not admin:
-            default_admin = Admin(
+            admin = Admin(
                 full_name="Rose Khatiwada",
                 username="Rose",
                 email="rkc123@gmail.com",
                 password=hash_password("Rose@123")
             )
-            db.add(default_admin)
+            db.add(admin)
+            db.flush()
+            identity = AdminIdentity.of(admin)
             db.commit()
+            admin_identity.publish(identity)
             print("Default admin account created: username='Rose', password='Rose@123'")
+        return admin
     except Exception as e:
         print(f"Error initializing admin: {e}")
         db.rollback()
+        return None
+    finally:
+        if own_session:
+            db.close()
+
+
+# -------------------------
+# DB Dependency
+# -------------------------
+def get_db(request: Request):
+    # GET requests read from a replica (when configured); writes use the primary
+    replica = read_replica_for(request)
+    # The Session is only created when the handler first uses it
+    factory = SessionLocal if replica is None else partial(SessionLocal, read_engine=replica.engine)
+    db = LazySession(factory)
+    try:
+        yield db
     finally:
         db.close()
 
-# Initialize admin on startup
-init_admin()
+# -------------------------
+# Cached per-level content
+# -------------------------
+def load_on_primary(db: Session, load, level: str):
+    """
+    Run a content cache loader on the primary. Its result is cached under the
+    version the last write bumped, and a lagging replica may not have that
+    write yet.
+    """
+    if getattr(db, "read_engine", None) is None:
+        return load(db, level)
+    with SessionLocal() as primary:
+        return load(primary, level)
+
+def get_level_lessons(db: Session, level: str):
+    """Lesson cards for one sign level, served from the content cache."""
+    return content_cache.get_or_load(
+        ("lessons", level, content_version()), lambda: load_on_primary(db, lesson_cards, level)
+    )
+
+def get_level_quizzes(db: Session, level: str):
+    """Quiz cards for one level, served from the content cache."""
+    return content_cache.get_or_load(
+        ("quizzes", level, content_version()), lambda: load_on_primary(db, quiz_cards, level)
+    )
+
+# -------------------------
+# Cached page rendering
+# -------------------------
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against a strong ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def _render_page(request: Request, template_name: str, key, context: dict) -> tuple:
+    context["request"] = request
+    body = templates.get_template(template_name).render(context).encode("utf-8")
+    page = (body, '"%s"' % hashlib.sha256(body).hexdigest()[:32])
+    page_cache.set(key, page)
+    return page
+
+def _page_response(request: Request, page: tuple) -> Response:
+    body, etag = page
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=body, headers=headers)
+
+def render_cached(request: Request, template_name: str, load_context=None) -> Response:
+    """
+    Render a public template through the page cache.
 
+    The body is cached per (template, content version) together with a strong
+    ETag, so a matching If-None-Match gets a 304 without rendering the
+    template or calling `load_context` (and therefore without a DB hit).
+    """
+    key = (template_name, content_version())
+    page = page_cache.get(key)
+    if page is None:
+        page = _render_page(request, template_name, key, load_context() if load_context else {})
+    return _page_response(request, page)
 
 # -------------------------
-# Helper function to save uploaded file
+# Async read routes (ASYNC_ROUTES)
 # -------------------------
-async def save_uploaded_file(file: UploadFile) -> str:
-    """Save uploaded file and return the relative path"""
-    # Generate unique filename
-    file_ext = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(IMAGES_DIR, unique_filename)
+# Registered before the sync routes below, so for an enabled group the async
+# handler serves the path and the sync one is never matched.
+def async_route(group: str, path: str):
+    """Serve GET `path` with this async handler when `group` is in ASYNC_ROUTES."""
+    def decorator(func):
+        if group in ASYNC_ROUTES:
+            app.get(path, response_class=HTMLResponse)(func)
+        return func
+    return decorator
+
+async def load_on_primary_async(db: AsyncSession, load, level: str):
+    """load_on_primary() for an AsyncSession that may be bound to a replica."""
+    if db.bind is get_async_engine():
+        return await load(db, level)
+    async with new_async_session() as primary:
+        return await load(primary, level)
+
+async def get_level_lessons_async(db: AsyncSession, level: str):
+    key = ("lessons", level, content_version())
+    lessons = content_cache.get(key)
+    if lessons is None:
+        lessons = await load_on_primary_async(db, lesson_cards_async, level)
+        content_cache.set(key, lessons)
+    return lessons
+
+async def get_level_quizzes_async(db: AsyncSession, level: str):
+    key = ("quizzes", level, content_version())
+    quizzes = content_cache.get(key)
+    if quizzes is None:
+        quizzes = await load_on_primary_async(db, quiz_cards_async, level)
+        content_cache.set(key, quizzes)
+    return quizzes
+
+async def render_level_async(request: Request, db: AsyncSession, template_name: str, kind: str, level: str):
+    """render_cached() for a level page, loading its cards on the AsyncSession on a miss."""
+    key = (template_name, content_version())
+    page = page_cache.get(key)
+    if page is None:
+        if kind == "quizzes":
+            cards = await get_level_quizzes_async(db, level)
+        else:
+            cards = await get_level_lessons_async(db, level)
+        page = _render_page(request, template_name, key, {kind: cards})
+    return _page_response(request, page)
+
+@async_route("levels", "/beginner")
+@query_budget(1)
+async def beginner_quiz_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await render_level_async(request, db, "beginner.html", "quizzes", "Beginner")
+
+@async_route("levels", "/intermediate")
+@query_budget(1)
+async def intermediate_quiz_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await render_level_async(request, db, "intermediate.html", "quizzes", "Intermediate")
+
+@async_route("levels", "/advance")
+@query_budget(1)
+async def advance_quiz_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await render_level_async(request, db, "advance.html", "quizzes", "Advance")
+
+@async_route("levels", "/lessons")
+@query_budget(1)
+async def lessons_page_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await render_level_async(request, db, "lessons.html", "lessons", "Basic")
+
+@async_route("levels", "/intermediatee")
+@query_budget(1)
+async def intermediate_lessons_page_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await render_level_async(request, db, "intermediatee.html", "lessons", "Intermediate")
+
+@async_route("levels", "/advancee")
+@query_budget(1)
+async def advance_lessons_page_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await render_level_async(request, db, "advancee.html", "lessons", "Advance")
+
+@async_route("listings", "/quizzes")
+@query_budget(1)
+async def public_quizzes_page_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    stats = await get_stats_async(db)
+    return templates.TemplateResponse(
+        "quizzes.html",
+        {
+            "request": request,
+            "beginner_count": stats.quizzes_at("Beginner"),
+            "intermediate_count": stats.quizzes_at("Intermediate"),
+            "advance_count": stats.quizzes_at("Advance"),
+        },
+    )
+
+@async_route("listings", "/add_quizzes")
+@query_budget(1)
+async def quizzes_page_async(
+    request: Request,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    size: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    page = await quiz_rows_page_async(db, after=after, before=before, size=size)
+    return templates.TemplateResponse(
+        "add_quizzes.html",
+        {"request": request, "quizzes": page.items, "page": page},
+    )
+
+@async_route("listings", "/add_lessons")
+@query_budget(1)
+async def add_lessons_page_async(
+    request: Request,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    size: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    page = await lesson_rows_page_async(db, after=after, before=before, size=size)
+    return templates.TemplateResponse(
+        "add_lessons.html", {"request": request, "lessons": page.items, "page": page}
+    )
 
-    # Save file
-    content = await file.read()
-    with open(file_path, "wb") as buffer:
-        buffer.write(content)
+@async_route("dashboard", "/dashboard")
+@query_budget(2)
+async def dashboard_page_async(
+    request: Request,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    size: Optional[int] = None,
+    q: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    page = await user_rows_page_async(db, q=q, after=after, before=before, size=size)
+    stats = await get_stats_async(db)
+    return dashboard_response(request, page, stats, q)
+
+@async_route("profile", "/profile")
+@query_budget(1)
+async def profile_page_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return RedirectResponse(url="/login", status_code=303)
 
-    # Reset file pointer for potential reuse
-    await file.seek(0)
+    user = await db.get(User, user_id)
+    if not user:
+        return RedirectResponse(url="/login", status_code=303)
 
-    # Return relative path for database storage
-    return f"/static/images/{unique_filename}"
+    return templates.TemplateResponse(
+        "profile.html",
+        {
+            "request": request,
+            "user": user,
+            "error": None,
+            "success": None,
+        },
+    )
 
 # -------------------------
-# DB Dependency
+# Metrics
 # -------------------------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.get("/metrics", response_class=PlainTextResponse)
+@query_budget(0)
+def metrics():
+    """Prometheus scrape endpoint for this worker."""
+    series = {
+        "quiz_attempts_pending": ("gauge", "Quiz attempts buffered but not yet written.", attempt_buffer.pending()),
+    }
+    for name, cache in (("content", content_cache), ("page", page_cache)):
+        cache_stats = cache.stats()
+        series[f"{name}_cache_hits_total"] = ("counter", f"Hits in the {name} cache.", cache_stats["hits"])
+        series[f"{name}_cache_misses_total"] = ("counter", f"Misses in the {name} cache.", cache_stats["misses"])
+        series[f"{name}_cache_entries"] = ("gauge", f"Entries in the {name} cache.", cache_stats["size"])
+    series.update(pool_series())
+    series.update(availability.series())
+    if replicas:
+        series["db_replicas_healthy"] = ("gauge", "Read replicas currently in rotation.", replicas.healthy_count())
+    return PlainTextResponse(render_metrics(series), media_type="text/plain; version=0.0.4")
+
+# -------------------------
+# Profiling
+# -------------------------
+@app.get("/profiling", response_class=HTMLResponse)
+@query_budget(0)
+def profiling_page(request: Request):
+    """Admin list of the slowest profiled requests with links to their flamegraph files."""
+    if not request.session.get("is_admin"):
+        return RedirectResponse(url="/login", status_code=303)
+    return templates.TemplateResponse(
+        "profiling.html", {"request": request, "captures": list_captures()}
+    )
+
+@app.get("/profiling/{name}")
+@query_budget(0)
+def profiling_file(request: Request, name: str):
+    if not request.session.get("is_admin"):
+        return RedirectResponse(url="/login", status_code=303)
+    path = capture_file(name)
+    if path is None:
+        return PlainTextResponse("Not found", status_code=404)
+    media_type = "application/json" if name.endswith(".json") else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=name)
 
 # -------------------------
 # GET Routes
 # -------------------------
 @app.get("/", response_class=HTMLResponse)
+@query_budget(0)
 def landing_page(request: Request):
-    return templates.TemplateResponse("landing_page.html", {"request": request})
+    return render_cached(request, "landing_page.html")
 
 @app.get("/home", response_class=HTMLResponse)
+@query_budget(0)
 def home_page(request: Request):
-    return templates.TemplateResponse("home.html", {"request": request})
+    return render_cached(request, "home.html")
 
 @app.get("/login", response_class=HTMLResponse)
+@query_budget(0)
 def login_form(request: Request):
     return templates.TemplateResponse("login.html", {"request": request, "error": None})
 
 @app.get("/register", response_class=HTMLResponse)
+@query_budget(0)
 def register_form(request: Request):
     return templates.TemplateResponse("register.html", {"request": request, "error": None})
 
 @app.get("/about", response_class=HTMLResponse)
+@query_budget(0)
 def about_us(request: Request):
-    return templates.TemplateResponse("about_us.html", {"request": request})
+    return render_cached(request, "about_us.html")
 
 @app.get("/contact", response_class=HTMLResponse)
+@query_budget(0)
 def contact_us(request: Request):
-    return templates.TemplateResponse("contact_us.html", {"request": request})
+    return render_cached(request, "contact_us.html")
 
 @app.get("/profile", response_class=HTMLResponse)
+@query_budget(1)
 def profile_page(request: Request, db: Session = Depends(get_db)):
     """
     User profile page showing current user's login details.
@@ -147,120 +537,160 @@ def profile_page(request: Request, db: Session = Depends(get_db)):
     )
 
 @app.get("/add_quizzes", response_class=HTMLResponse)
-def quizzes_page(request: Request, db: Session = Depends(get_db)):
-    """Admin view to add/edit quizzes."""
-    quizzes = db.query(Quiz).all()
+@query_budget(1)
+def quizzes_page(
+    request: Request,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    size: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Admin view to add/edit quizzes, one keyset page at a time."""
+    page = quiz_rows_page(db, after=after, before=before, size=size)
     return templates.TemplateResponse(
         "add_quizzes.html",
-        {"request": request, "quizzes": quizzes},
+        {"request": request, "quizzes": page.items, "page": page},
     )
 
 
 @app.get("/quizzes", response_class=HTMLResponse)
+@query_budget(1)
 def public_quizzes_page(request: Request, db: Session = Depends(get_db)):
     """
     Public quizzes listing page showing all quizzes created via the admin panel.
     """
-    quizzes = db.query(Quiz).all()
-
     # Count quizzes per level so the public list stays in sync with admin-added quizzes
-    beginner_count = sum(1 for q in quizzes if q.level == "Beginner")
-    intermediate_count = sum(1 for q in quizzes if q.level == "Intermediate")
-    advance_count = sum(1 for q in quizzes if q.level == "Advance")
+    stats = get_stats(db)
 
     return templates.TemplateResponse(
         "quizzes.html",
         {
             "request": request,
-            "quizzes": quizzes,
-            "beginner_count": beginner_count,
-            "intermediate_count": intermediate_count,
-            "advance_count": advance_count,
+            "beginner_count": stats.quizzes_at("Beginner"),
+            "intermediate_count": stats.quizzes_at("Intermediate"),
+            "advance_count": stats.quizzes_at("Advance"),
         },
     )
 
 @app.get("/beginner", response_class=HTMLResponse)
+@query_budget(1)
 def beginner_quiz(request: Request, db: Session = Depends(get_db)):
     """
     Beginner quiz page showing only quizzes created in the admin with level 'Beginner'.
     """
-    quizzes = db.query(Quiz).filter(Quiz.level == "Beginner").all()
-    return templates.TemplateResponse(
+    return render_cached(
+        request,
         "beginner.html",
-        {"request": request, "quizzes": quizzes},
+        lambda: {"quizzes": get_level_quizzes(db, "Beginner")},
     )
 
 @app.get("/intermediate", response_class=HTMLResponse)
+@query_budget(1)
 def intermediate_quiz(request: Request, db: Session = Depends(get_db)):
     """
     Intermediate quiz page showing only quizzes created in the admin with level 'Intermediate'.
     """
-    quizzes = db.query(Quiz).filter(Quiz.level == "Intermediate").all()
-    return templates.TemplateResponse(
+    return render_cached(
+        request,
         "intermediate.html",
-        {"request": request, "quizzes": quizzes},
+        lambda: {"quizzes": get_level_quizzes(db, "Intermediate")},
     )
 
 @app.get("/advance", response_class=HTMLResponse)
+@query_budget(1)
 def advance_quiz(request: Request, db: Session = Depends(get_db)):
     """
     Advance quiz page showing only quizzes created in the admin with level 'Advance'.
     """
-    quizzes = db.query(Quiz).filter(Quiz.level == "Advance").all()
-    return templates.TemplateResponse(
+    return render_cached(
+        request,
         "advance.html",
-        {"request": request, "quizzes": quizzes},
+        lambda: {"quizzes": get_level_quizzes(db, "Advance")},
     )
 
 @app.get("/lessons", response_class=HTMLResponse)
+@query_budget(1)
 def lessons_page(request: Request, db: Session = Depends(get_db)):
     # Fetch only Basic level lessons
-    lessons = db.query(Lesson).filter(Lesson.sign_level == "Basic").all()
-    return templates.TemplateResponse("lessons.html", {"request": request, "lessons": lessons})
+    return render_cached(request, "lessons.html", lambda: {"lessons": get_level_lessons(db, "Basic")})
 
 @app.get("/intermediatee", response_class=HTMLResponse)
+@query_budget(1)
 def intermediate_lessons_page(request: Request, db: Session = Depends(get_db)):
     # Fetch only Intermediate level lessons
-    lessons = db.query(Lesson).filter(Lesson.sign_level == "Intermediate").all()
-    return templates.TemplateResponse("intermediatee.html", {"request": request, "lessons": lessons})
+    return render_cached(request, "intermediatee.html", lambda: {"lessons": get_level_lessons(db, "Intermediate")})
 
 @app.get("/advancee", response_class=HTMLResponse)
+@query_budget(1)
 def advance_lessons_page(request: Request, db: Session = Depends(get_db)):
     # Fetch only Advance level lessons
-    lessons = db.query(Lesson).filter(Lesson.sign_level == "Advance").all()
-    return templates.TemplateResponse("advancee.html", {"request": request, "lessons": lessons})
+    return render_cached(request, "advancee.html", lambda: {"lessons": get_level_lessons(db, "Advance")})
 
+# -------------------------
+# Lesson search
+# -------------------------
+LEVEL_PAGES = {"Basic": "/lessons", "Intermediate": "/intermediatee", "Advance": "/advancee"}
 
-@app.get("/dashboard", response_class=HTMLResponse)
-def dashboard_page(request: Request, db: Session = Depends(get_db)):
-    """
-    Admin dashboard showing basic stats and user list.
-    """
-    users = db.query(User).all()
-    user_count = len(users)
-    lesson_count = db.query(Lesson).count()
-    quiz_count = db.query(Quiz).count()
+@app.get("/search", response_class=HTMLResponse)
+@query_budget(0)
+def search_page(request: Request, q: str = ""):
+    """Lessons matching every word of `q` (the last one as a prefix), best first."""
+    q = q.strip()[:200]
+    return templates.TemplateResponse(
+        "search.html",
+        {"request": request, "q": q, "hits": lesson_index.search(q), "level_pages": LEVEL_PAGES},
+    )
 
+
+def render_dashboard(
+    request: Request,
+    db: Session,
+    user_error: Optional[str] = None,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    size: Optional[int] = None,
+    q: Optional[str] = None,
+):
+    """Render the dashboard with one keyset page of users, optionally prefix-searched."""
+    page = user_rows_page(db, q=q, after=after, before=before, size=size)
+    return dashboard_response(request, page, get_stats(db), q, user_error)
+
+def dashboard_response(request: Request, page, stats, q: Optional[str] = None, user_error: Optional[str] = None):
     return templates.TemplateResponse(
         "dashboard.html",
         {
             "request": request,
-            "users": users,
-            "user_count": user_count,
-            "lesson_count": lesson_count,
-            "quiz_count": quiz_count,
-            "user_error": None,
+            "users": page.items,
+            "page": page,
+            "q": q or "",
+            "user_count": stats.user_count,
+            "lesson_count": stats.lesson_count,
+            "quiz_count": stats.quiz_count,
+            "user_error": user_error,
         },
     )
 
+@app.get("/dashboard", response_class=HTMLResponse)
+@query_budget(2)
+def dashboard_page(
+    request: Request,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    size: Optional[int] = None,
+    q: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Admin dashboard showing basic stats and a paginated, searchable user list.
+    """
+    return render_dashboard(request, db, after=after, before=before, size=size, q=q)
+
 @app.get("/admin_profile", response_class=HTMLResponse)
+@query_budget(2)
 def admin_profile_page(request: Request, db: Session = Depends(get_db)):
     """Admin profile page with current admin data."""
-    admin = db.query(Admin).first()
-    if not admin:
-        # If no admin exists, create default one
-        init_admin()
-        admin = db.query(Admin).first()
+    # Served from the admin identity cache; creates the default admin if none exists
+    admin = admin_identity.get() or init_admin(db)
     
     return templates.TemplateResponse(
         "admin_profile.html",
@@ -273,22 +703,65 @@ def admin_profile_page(request: Request, db: Session = Depends(get_db)):
     )
 
 @app.get("/add_lessons", response_class=HTMLResponse)
-def add_lessons_page(request: Request, db: Session = Depends(get_db)):
-    # Fetch all lessons for display in table
-    lessons = db.query(Lesson).all()
-    return templates.TemplateResponse("add_lessons.html", {"request": request, "lessons": lessons})
+@query_budget(1)
+def add_lessons_page(
+    request: Request,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    size: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    # Fetch one keyset page of lessons for display in table
+    page = lesson_rows_page(db, after=after, before=before, size=size)
+    return templates.TemplateResponse(
+        "add_lessons.html", {"request": request, "lessons": page.items, "page": page}
+    )
 
 
 @app.get("/logout")
+@query_budget(0)
 def logout(request: Request):
     """Logout route - clears session and redirects to login."""
     request.session.clear()
     return RedirectResponse(url="/login", status_code=303)
 
+# -------------------------
+# Username / email availability
+# -------------------------
+@app.get("/api/availability")
+@query_budget(2)
+def availability_check(
+    request: Request,
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Live check for the register and profile forms. Most free names are
+    answered from the in-memory filter; the signed-in user's own username
+    and email count as available.
+    """
+    user_id = request.session.get("user_id")
+    admin = admin_identity.get()
+    result = {}
+    for field, value in (("username", username), ("email", email)):
+        value = (value or "").strip()
+        if not value:
+            continue
+        if admin and value.lower() == getattr(admin, f"{field}_lower"):
+            result[field] = {"available": False, "reason": "reserved"}
+        elif availability.is_taken(db, field, value, exclude_user_id=user_id):
+            result[field] = {"available": False, "reason": "taken"}
+        else:
+            result[field] = {"available": True}
+    return JSONResponse(result)
+
+
 # -------------------------
 # POST Register
 # -------------------------
 @app.post("/register")
+@query_budget(2)
 def register_submit(
     request: Request,
     email: str = Form(...),
@@ -304,25 +777,27 @@ def register_submit(
         )
 
     # Prevent anyone from registering with admin username/email
-    admin = db.query(Admin).first()
-    if admin:
-        if username.lower() == admin.username.lower() or email.lower() == admin.email.lower():
-            return templates.TemplateResponse(
-                "register.html",
-                {"request": request, "error": "This username or email is reserved!"}
-            )
+    admin = admin_identity.get()
+    if admin and admin.reserves(username, email):
+        return templates.TemplateResponse(
+            "register.html",
+            {"request": request, "error": "This username or email is reserved!"}
+        )
 
     # Check if username or email exists
-    existing_user = db.query(User).filter(or_(User.username == username, User.email == email)).first()
-    if existing_user:
+    if identity_taken(db, username, email):
         return templates.TemplateResponse(
             "register.html", {"request": request, "error": "Username or email already exists!"}
         )
 
     # Create normal user
-    user = User(email=email, username=username, password=hash_password(password))
+    user = User(email=email, username=username, password=hash_password_pooled(password))
     db.add(user)
+    db.flush()
+    user_id = user.id
     db.commit()
+    invalidate_stats()
+    availability.add_user(user_id, username, email)
 
     return RedirectResponse(url="/login", status_code=303)
 
@@ -330,19 +805,26 @@ def register_submit(
 # POST Login
 # -------------------------
 @app.post("/login")
+@query_budget(2)
 def login_submit(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    # Admin check from database
-    admin = db.query(Admin).first()
+    # Admin check against the cached admin identity (no query)
+    admin = admin_identity.get()
     if admin and username == admin.username:
-        if not verify_password(password, admin.password):
+        valid, new_hash = verify_password_pooled(password, admin.password)
+        if not valid:
             return templates.TemplateResponse(
                 "login.html", {"request": request, "error": "Incorrect password"}
             )
+        # Rehash transparently when the Argon2 parameters have changed
+        if new_hash:
+            db.query(Admin).filter(Admin.id == admin.id).update({Admin.password: new_hash})
+            db.commit()
+            admin_identity.publish(admin._replace(password=new_hash))
         # Store admin session
         request.session["admin_id"] = admin.id
         request.session["is_admin"] = True
@@ -355,10 +837,14 @@ def login_submit(
             "login.html", {"request": request, "error": "User not found"}
         )
 
-    if not verify_password(password, user.password):
+    valid, new_hash = verify_password_pooled(password, user.password)
+    if not valid:
         return templates.TemplateResponse(
             "login.html", {"request": request, "error": "Incorrect password"}
         )
+    if new_hash:
+        user.password = new_hash
+        db.commit()
 
     # Store user session
     request.session["user_id"] = user.id
@@ -370,6 +856,7 @@ def login_submit(
 # POST Update User (Admin)
 # -------------------------
 @app.post("/update_user")
+@query_budget(4)
 def update_user_submit(
     request: Request,
     user_id: int = Form(...),
@@ -381,40 +868,20 @@ def update_user_submit(
     Allow admin to update a user's email and username.
     """
     # Check if the new email/username is already used by another user
-    existing = (
-        db.query(User)
-        .filter(
-            or_(User.email == email, User.username == username),
-            User.id != user_id,
-        )
-        .first()
-    )
-
-    if existing:
-        users = db.query(User).all()
-        user_count = len(users)
-        lesson_count = db.query(Lesson).count()
-        quiz_count = db.query(Quiz).count()
-
-        return templates.TemplateResponse(
-            "dashboard.html",
-            {
-                "request": request,
-                "users": users,
-                "user_count": user_count,
-                "lesson_count": lesson_count,
-                "quiz_count": quiz_count,
-                "user_error": "Email or username is already in use by another account.",
-            },
+    if identity_taken(db, username, email, exclude_user_id=user_id):
+        return render_dashboard(
+            request, db, user_error="Email or username is already in use by another account."
         )
 
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         return RedirectResponse(url="/dashboard", status_code=303)
 
+    previous = (user.username, user.email)
     user.email = email
     user.username = username
     db.commit()
+    availability.replace_user(user_id, previous, (username, email))
 
     return RedirectResponse(url="/dashboard", status_code=303)
 
@@ -423,6 +890,7 @@ def update_user_submit(
 # POST Delete User (Admin)
 # -------------------------
 @app.post("/delete_user")
+@query_budget(2)
 def delete_user_submit(
     request: Request,
     user_id: int = Form(...),
@@ -435,14 +903,13 @@ def delete_user_submit(
     user = db.query(User).filter(User.id == user_id).first()
     if user:
         # Don't allow deleting if username/email matches admin
-        admin = db.query(Admin).first()
-        if admin:
-            if not (user.username == admin.username or user.email == admin.email):
-                db.delete(user)
-                db.commit()
-        else:
+        admin = admin_identity.get()
+        if not admin or not (user.username == admin.username or user.email == admin.email):
+            previous = (user.username, user.email)
             db.delete(user)
             db.commit()
+            invalidate_stats()
+            availability.remove_user(user_id, *previous)
 
     return RedirectResponse(url="/dashboard", status_code=303)
 
@@ -450,6 +917,7 @@ def delete_user_submit(
 # POST Add Lesson
 # -------------------------
 @app.post("/add_lessons")
+@query_budget(1)
 async def add_lesson_submit(
     request: Request,
     sign_level: str = Form(...),
@@ -461,6 +929,7 @@ async def add_lesson_submit(
 ):
     # Save uploaded image file
     image_path = await save_uploaded_file(image)
+    schedule_derivatives(image_path)
     
     # Create new lesson
     lesson = Lesson(
@@ -471,8 +940,12 @@ async def add_lesson_submit(
         description=description
     )
     db.add(lesson)
+    db.flush()
+    document = SearchDocument(lesson.id, sign_level, name, image_path, heading, description)
     db.commit()
-    db.refresh(lesson)
+    bump_content_version()
+    lesson_version.bump()
+    lesson_index.upsert(document)
     
     return RedirectResponse(url="/add_lessons", status_code=303)
 
@@ -480,6 +953,7 @@ async def add_lesson_submit(
 # POST Update Lesson
 # -------------------------
 @app.post("/update_lesson")
+@query_budget(2)
 async def update_lesson_submit(
     request: Request,
     lesson_id: int = Form(...),
@@ -505,12 +979,17 @@ async def update_lesson_submit(
     # Update image only if a new file is uploaded
     if image and image.filename:
         image_path = await save_uploaded_file(image)
+        schedule_derivatives(image_path)
         lesson.image = image_path
     elif existing_image:
         # Keep existing image if no new file uploaded
         lesson.image = existing_image
     
+    document = SearchDocument(lesson.id, sign_level, name, lesson.image, heading, description)
     db.commit()
+    bump_content_version()
+    lesson_version.bump()
+    lesson_index.upsert(document)
     
     return RedirectResponse(url="/add_lessons", status_code=303)
 
@@ -518,6 +997,7 @@ async def update_lesson_submit(
 # POST Delete Lesson
 # -------------------------
 @app.post("/delete_lesson")
+@query_budget(2)
 def delete_lesson_submit(
     request: Request,
     lesson_id: int = Form(...),
@@ -528,6 +1008,9 @@ def delete_lesson_submit(
     if lesson:
         db.delete(lesson)
         db.commit()
+        bump_content_version()
+        lesson_version.bump()
+        lesson_index.delete(lesson_id)
     
     return RedirectResponse(url="/add_lessons", status_code=303)
 
@@ -536,6 +1019,7 @@ def delete_lesson_submit(
 # POST Add Quiz
 # -------------------------
 @app.post("/add_quiz")
+@query_budget(1)
 async def add_quiz_submit(
     request: Request,
     level: str = Form(...),
@@ -553,12 +1037,17 @@ async def add_quiz_submit(
     correct_option: int = Form(...),
     db: Session = Depends(get_db),
 ):
-    # Save images if provided
-    question_image_path = await save_uploaded_file(question_image) if question_image and question_image.filename else None
-    opt1_img_path = await save_uploaded_file(option1_image) if option1_image and option1_image.filename else None
-    opt2_img_path = await save_uploaded_file(option2_image) if option2_image and option2_image.filename else None
-    opt3_img_path = await save_uploaded_file(option3_image) if option3_image and option3_image.filename else None
-    opt4_img_path = await save_uploaded_file(option4_image) if option4_image and option4_image.filename else None
+    # Save images if provided (concurrently, None where nothing was uploaded)
+    (
+        question_image_path,
+        opt1_img_path,
+        opt2_img_path,
+        opt3_img_path,
+        opt4_img_path,
+    ) = await save_uploaded_files(
+        [question_image, option1_image, option2_image, option3_image, option4_image]
+    )
+    schedule_derivatives(question_image_path, opt1_img_path, opt2_img_path, opt3_img_path, opt4_img_path)
 
     quiz = Quiz(
         level=level,
@@ -577,7 +1066,7 @@ async def add_quiz_submit(
     )
     db.add(quiz)
     db.commit()
-    db.refresh(quiz)
+    bump_content_version()
 
     return RedirectResponse(url="/add_quizzes", status_code=303)
 
@@ -586,6 +1075,7 @@ async def add_quiz_submit(
 # POST Update Quiz
 # -------------------------
 @app.post("/update_quiz")
+@query_budget(2)
 async def update_quiz_submit(
     request: Request,
     quiz_id: int = Form(...),
@@ -617,41 +1107,27 @@ async def update_quiz_submit(
     # Allow empty question text
     quiz.question_text = question_text if question_text else None
 
-    # Question image
-    if question_image and question_image.filename:
-        quiz.question_image = await save_uploaded_file(question_image)
-    else:
-        quiz.question_image = existing_question_image
-
     quiz.option1_text = option1_text
     quiz.option2_text = option2_text
     quiz.option3_text = option3_text
     quiz.option4_text = option4_text
 
-    # Option images
-    if option1_image and option1_image.filename:
-        quiz.option1_image = await save_uploaded_file(option1_image)
-    else:
-        quiz.option1_image = existing_option1_image
-
-    if option2_image and option2_image.filename:
-        quiz.option2_image = await save_uploaded_file(option2_image)
-    else:
-        quiz.option2_image = existing_option2_image
-
-    if option3_image and option3_image.filename:
-        quiz.option3_image = await save_uploaded_file(option3_image)
-    else:
-        quiz.option3_image = existing_option3_image
-
-    if option4_image and option4_image.filename:
-        quiz.option4_image = await save_uploaded_file(option4_image)
-    else:
-        quiz.option4_image = existing_option4_image
+    # Question and option images: new uploads are saved concurrently,
+    # otherwise the existing image is kept
+    new_images = await save_uploaded_files(
+        [question_image, option1_image, option2_image, option3_image, option4_image]
+    )
+    schedule_derivatives(*new_images)
+    quiz.question_image = new_images[0] or existing_question_image
+    quiz.option1_image = new_images[1] or existing_option1_image
+    quiz.option2_image = new_images[2] or existing_option2_image
+    quiz.option3_image = new_images[3] or existing_option3_image
+    quiz.option4_image = new_images[4] or existing_option4_image
 
     quiz.correct_option = correct_option
 
     db.commit()
+    bump_content_version()
 
     return RedirectResponse(url="/add_quizzes", status_code=303)
 
@@ -660,6 +1136,7 @@ async def update_quiz_submit(
 # POST Delete Quiz
 # -------------------------
 @app.post("/delete_quiz")
+@query_budget(2)
 def delete_quiz_submit(
     request: Request,
     quiz_id: int = Form(...),
@@ -669,14 +1146,168 @@ def delete_quiz_submit(
     if quiz:
         db.delete(quiz)
         db.commit()
+        bump_content_version()
 
     return RedirectResponse(url="/add_quizzes", status_code=303)
 
 
+# -------------------------
+# Bulk Import / Export
+# -------------------------
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+def _bulk_import(request, db, spec, template_name, page_loader, items_key, file, images, dry_run):
+    images_file = images.file if images is not None and images.filename else None
+    result = import_content(db, spec, file.file, file.filename, images_file, dry_run=dry_run)
+    if result.inserted:
+        bump_content_version()
+        invalidate_stats()
+        if spec is LESSON_SPEC:
+            # Imported rows bypass upsert(); the refresh thread rebuilds from the table
+            lesson_version.bump()
+            lesson_index.request_sync()
+    page = page_loader(db)
+    return templates.TemplateResponse(
+        template_name,
+        {"request": request, items_key: page.items, "page": page, "import_result": result},
+        status_code=200 if not result.error_count else 400,
+    )
+
+def _bulk_export(spec, fmt: str, basename: str):
+    fmt = fmt if fmt in EXPORT_MEDIA_TYPES else "csv"
+    return StreamingResponse(
+        export_content(spec, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{basename}.{fmt}"'},
+    )
+
+@app.post("/import_lessons")
+@query_budget(2, allow_repeats=True)
+def import_lessons_submit(
+    request: Request,
+    file: UploadFile = File(...),
+    images: Optional[UploadFile] = File(None),
+    dry_run: bool = Form(False),
+    db: Session = Depends(get_db),
+):
+    """Import lessons from a CSV/JSONL file, optionally with a zip of their images."""
+    return _bulk_import(
+        request, db, LESSON_SPEC, "add_lessons.html", lesson_rows_page, "lessons", file, images, dry_run
+    )
+
+@app.post("/import_quizzes")
+@query_budget(2, allow_repeats=True)
+def import_quizzes_submit(
+    request: Request,
+    file: UploadFile = File(...),
+    images: Optional[UploadFile] = File(None),
+    dry_run: bool = Form(False),
+    db: Session = Depends(get_db),
+):
+    """Import quizzes from a CSV/JSONL file, optionally with a zip of their images."""
+    return _bulk_import(
+        request, db, QUIZ_SPEC, "add_quizzes.html", quiz_rows_page, "quizzes", file, images, dry_run
+    )
+
+@app.get("/export_lessons")
+@query_budget(1)
+def export_lessons(format: str = "csv"):
+    return _bulk_export(LESSON_SPEC, format, "lessons")
+
+@app.get("/export_quizzes")
+@query_budget(1)
+def export_quizzes(format: str = "csv"):
+    return _bulk_export(QUIZ_SPEC, format, "quizzes")
+
+
+# -------------------------
+# POST Submit Quiz
+# -------------------------
+MAX_QUIZ_QUESTIONS = 200
+
+def _parse_option(value) -> Optional[int]:
+    try:
+        option = int(value)
+    except (TypeError, ValueError):
+        return None
+    return option if 1 <= option <= 4 else None
+
+def _grade_attempt(db: Session, selections: dict, user_id: Optional[int]) -> dict:
+    """Look up the correct answers with one query and queue the result rows."""
+    # One lookup for every submitted question
+    answers = {}
+    if selections:
+        answers = {
+            quiz_id: (correct_option, level)
+            for quiz_id, correct_option, level in db.query(Quiz.id, Quiz.correct_option, Quiz.level)
+            .filter(Quiz.id.in_(list(selections)))
+        }
+
+    attempt_id = str(uuid.uuid4())
+    results = []
+    rows = []
+    for quiz_id, selected in selections.items():
+        if quiz_id not in answers:
+            continue
+        correct_option, level = answers[quiz_id]
+        is_correct = selected == correct_option
+        results.append(
+            {
+                "quiz_id": quiz_id,
+                "selected_option": selected,
+                "correct_option": correct_option,
+                "is_correct": is_correct,
+            }
+        )
+        rows.append(
+            {
+                "attempt_id": attempt_id,
+                "user_id": user_id,
+                "quiz_id": quiz_id,
+                "level": level,
+                "selected_option": selected,
+                "is_correct": is_correct,
+            }
+        )
+    attempt_buffer.add(rows)
+
+    return {
+        "attempt_id": attempt_id,
+        "score": sum(1 for r in results if r["is_correct"]),
+        "total": len(results),
+        "results": results,
+    }
+
+@app.post("/submit_quiz")
+@query_budget(1)
+async def submit_quiz(request: Request, db: Session = Depends(get_db)):
+    """
+    Grade a whole quiz attempt with one query and queue the per-question results.
+
+    The form carries a `quiz_id` field per question and `answer_<quiz_id>`
+    for every answered one. Results are recorded through the write-behind
+    attempt buffer rather than committed here.
+    """
+    form = await request.form()
+    selections = {}  # quiz_id -> selected option, in form order
+    for value in form.getlist("quiz_id"):
+        if not value.isdigit() or int(value) in selections:
+            continue
+        if len(selections) == MAX_QUIZ_QUESTIONS:
+            break
+        quiz_id = int(value)
+        selections[quiz_id] = _parse_option(form.get(f"answer_{quiz_id}"))
+
+    # The lookup and the buffer lock stay off the event loop
+    result = await run_in_threadpool(_grade_attempt, db, selections, request.session.get("user_id"))
+    return JSONResponse(result)
+
+
 # -------------------------
 # POST Update Admin Profile
 # -------------------------
 @app.post("/update_admin_profile")
+@query_budget(3)
 def update_admin_profile_submit(
     request: Request,
     full_name: str = Form(...),
@@ -690,17 +1321,11 @@ def update_admin_profile_submit(
     Allow admin to update their profile information.
     """
     # Get the admin account (there should only be one)
-    admin = db.query(Admin).first()
-    if not admin:
-        # If no admin exists, create default one
-        init_admin()
-        admin = db.query(Admin).first()
+    # Creates the default admin in this session if none exists
+    admin = init_admin(db)
     
     # Check if new username or email conflicts with existing users
-    existing_user = db.query(User).filter(
-        or_(User.username == username, User.email == email)
-    ).first()
-    if existing_user:
+    if identity_taken(db, username, email):
         return templates.TemplateResponse(
             "admin_profile.html",
             {
@@ -741,15 +1366,18 @@ def update_admin_profile_submit(
     
     # Only update password if a new one was provided
     if new_password:
-        admin.password = hash_password(new_password)
+        admin.password = hash_password_pooled(new_password)
     
+    # Taken before the commit expires the instance; every worker reloads it
+    identity = AdminIdentity.of(admin)
     db.commit()
+    admin_identity.publish(identity)
     
     return templates.TemplateResponse(
         "admin_profile.html",
         {
             "request": request,
-            "admin": admin,
+            "admin": identity,
             "error": None,
             "success": "Profile updated successfully!",
         },
@@ -760,6 +1388,7 @@ def update_admin_profile_submit(
 # POST Update User Profile
 # -------------------------
 @app.post("/update_user_profile")
+@query_budget(4)
 def update_user_profile_submit(
     request: Request,
     username: str = Form(...),
@@ -780,11 +1409,7 @@ def update_user_profile_submit(
         return RedirectResponse(url="/login", status_code=303)
     
     # Check if new username or email conflicts with another user
-    existing_user = db.query(User).filter(
-        or_(User.username == username, User.email == email),
-        User.id != user_id
-    ).first()
-    if existing_user:
+    if identity_taken(db, username, email, exclude_user_id=user_id):
         return templates.TemplateResponse(
             "profile.html",
             {
@@ -796,18 +1421,17 @@ def update_user_profile_submit(
         )
     
     # Check if username/email conflicts with admin
-    admin = db.query(Admin).first()
-    if admin:
-        if username.lower() == admin.username.lower() or email.lower() == admin.email.lower():
-            return templates.TemplateResponse(
-                "profile.html",
-                {
-                    "request": request,
-                    "user": user,
-                    "error": "This username or email is reserved.",
-                    "success": None,
-                },
-            )
+    admin = admin_identity.get()
+    if admin and admin.reserves(username, email):
+        return templates.TemplateResponse(
+            "profile.html",
+            {
+                "request": request,
+                "user": user,
+                "error": "This username or email is reserved.",
+                "success": None,
+            },
+        )
     
     # Validate password if provided
     if new_password:
@@ -833,14 +1457,16 @@ def update_user_profile_submit(
             )
     
     # Update user fields
+    previous = (user.username, user.email)
     user.username = username
     user.email = email
     
     # Only update password if a new one was provided
     if new_password:
-        user.password = hash_password(new_password)
+        user.password = hash_password_pooled(new_password)
     
     db.commit()
+    availability.replace_user(user_id, previous, (username, email))
     
     return templates.TemplateResponse(
         "profile.html",
@@ -0,0 +1,263 @@
+# app/metrics.py
+#
+# Request, database and template metrics in Prometheus text format.
+#
+# Hot-path updates take no locks: every thread writes to its own shard (the
+# event loop thread for request metrics, threadpool threads for queries and
+# template renders) and /metrics merges the shards when it is scraped. The
+# numbers are per worker process; Prometheus sums them across targets.
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+
+# Latency buckets in seconds, shared by every histogram
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+
+class Registry:
+    """Counters and histograms sharded per thread, plus gauges set in place."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.help: Dict[str, Tuple[str, str, tuple]] = {}
+        self._local = threading.local()
+        self._shards: List[Tuple[dict, dict]] = []
+        self._shards_lock = threading.Lock()
+        # Gauges replace their value, so they are not sharded (and rarely set)
+        self._gauges: dict = {}
+
+    def reset(self):
+        """Drop every value (in a forked worker, which reports only its own)."""
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._gauges = {}
+
+    def describe(self, name: str, kind: str, text: str, label_names: tuple = ()):
+        self.help[name] = (kind, text, label_names)
+
+    def _shard(self) -> Tuple[dict, dict]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = ({}, {})
+            with self._shards_lock:  # once per thread
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def inc(self, name: str, labels: tuple, amount: float = 1):
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def set(self, name: str, labels: tuple, value: float):
+        with self._shards_lock:
+            self._gauges[(name, labels)] = value
+
+    def observe(self, name: str, labels: tuple, value: float):
+        histograms = self._shard()[1]
+        key = (name, labels)
+        cells = histograms.get(key)
+        if cells is None:
+            # One cell per bucket plus +Inf, then sum and count
+            cells = histograms[key] = [0] * (len(self.buckets) + 3)
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-2] += value
+        cells[-1] += 1
+
+    def collect(self) -> Tuple[dict, dict]:
+        """Merge every thread's shard into (counters and gauges, histograms)."""
+        counters, histograms = {}, {}
+        with self._shards_lock:
+            shards = list(self._shards)
+            gauges = dict(self._gauges)
+        for shard_counters, shard_histograms in shards:
+            for key, value in list(shard_counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, cells in list(shard_histograms.items()):
+                merged = histograms.get(key)
+                if merged is None:
+                    histograms[key] = list(cells)
+                else:
+                    for i, value in enumerate(cells):
+                        merged[i] += value
+        counters.update(gauges)
+        return counters, histograms
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset)
+registry.describe(
+    "http_requests_total", "counter", "HTTP requests by method, route and status code.",
+    ("method", "route", "status"),
+)
+registry.describe(
+    "http_request_duration_seconds", "histogram", "HTTP request latency by method and route.",
+    ("method", "route"),
+)
+registry.describe(
+    "http_request_db_queries_total", "counter", "Database queries issued while serving requests.",
+    ("method", "route"),
+)
+registry.describe(
+    "http_request_db_seconds_total", "counter", "Time spent in database queries while serving requests.",
+    ("method", "route"),
+)
+registry.describe("db_query_duration_seconds", "histogram", "Latency of every database query, inside requests or not.")
+registry.describe("template_render_seconds", "histogram", "Jinja2 render time by template.", ("template",))
+
+
+class _InFlight:
+    """Requests currently being served. Only touched from the event loop thread."""
+    value = 0
+
+
+in_flight = _InFlight()
+
+# [query count, query seconds] for the request being served, if any
+_request_db: contextvars.ContextVar = contextvars.ContextVar("request_db", default=None)
+
+
+# -------------------------
+# Database
+# -------------------------
+def instrument_engine(engine):
+    """Time every statement executed on `engine` and charge it to the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        registry.observe("db_query_duration_seconds", (), elapsed)
+        totals = _request_db.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+# -------------------------
+# Templates
+# -------------------------
+def observe_template(name: str, seconds: float):
+    if METRICS_ENABLED:
+        registry.observe("template_render_seconds", (name,), seconds)
+
+
+# -------------------------
+# Requests
+# -------------------------
+def _route_label(scope, root_path: str) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("root_path", "") != root_path:
+        return scope["root_path"][len(root_path):]  # a mount, e.g. /static
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead, streaming untouched)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        root_path = scope.get("root_path", "")
+        totals = [0, 0.0]
+        token = _request_db.set(totals)
+        in_flight.value += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.value -= 1
+            _request_db.reset(token)
+            labels = (scope["method"], _route_label(scope, root_path))
+            registry.inc("http_requests_total", labels + (str(status[0]),))
+            registry.observe("http_request_duration_seconds", labels, elapsed)
+            if totals[0]:
+                registry.inc("http_request_db_queries_total", labels, totals[0])
+                registry.inc("http_request_db_seconds_total", labels, totals[1])
+
+
+# -------------------------
+# Exposition
+# -------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_metrics(extra: Dict[str, Tuple[str, str, float]] = None) -> str:
+    """
+    Prometheus text exposition of everything in the registry plus `extra`
+    unlabelled series (name -> (type, help, value)) supplied by the caller.
+    """
+    counters, histograms = registry.collect()
+    lines = []
+    by_name: Dict[str, list] = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for (name, labels), cells in histograms.items():
+        by_name.setdefault(name, []).append((labels, cells))
+
+    for name in registry.help:
+        if name not in by_name:
+            continue
+        kind, text, label_names = registry.help[name]
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(label_names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(registry.buckets + (float("inf"),), value):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{name}_bucket{_labels(label_names, labels, [le])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(label_names, labels)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(label_names, labels)} {value[-1]}")
+
+    extra = dict(extra or {})
+    extra["http_requests_in_flight"] = ("gauge", "HTTP requests currently being served.", in_flight.value)
+    for name, (kind, text, value) in extra.items():
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {_number(value)}")
+    return "\n".join(lines) + "\n"
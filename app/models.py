@@ -1,7 +1,7 @@
 # app/models.py
 
-from sqlalchemy import Column, Integer, String, Text
-from .database import Base, engine  # import engine from database.py
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, Text, func
+from .database import Base
 
 class User(Base):
     __tablename__ = "register"  # match your PostgreSQL table
@@ -11,6 +11,20 @@ class User(Base):
     username = Column(String(50), unique=True, index=True, nullable=False)
     password = Column(String(255), nullable=False)
 
+    # lower() indexes for the admin dashboard's case-insensitive prefix search
+    __table_args__ = (
+        Index(
+            "ix_register_username_lower",
+            func.lower(username).label("username_lower"),
+            postgresql_ops={"username_lower": "varchar_pattern_ops"},
+        ),
+        Index(
+            "ix_register_email_lower",
+            func.lower(email).label("email_lower"),
+            postgresql_ops={"email_lower": "varchar_pattern_ops"},
+        ),
+    )
+
 class Lesson(Base):
     __tablename__ = "lessons"
 
@@ -44,6 +58,19 @@ class Quiz(Base):
     correct_option = Column(Integer, nullable=False)  # 1–4
 
 
+class QuizAttempt(Base):
+    __tablename__ = "quiz_attempts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    attempt_id = Column(String(36), nullable=False, index=True)  # groups the answers of one submission
+    user_id = Column(Integer, nullable=True, index=True)  # None for anonymous attempts
+    quiz_id = Column(Integer, nullable=False, index=True)
+    level = Column(String(50), nullable=False)
+    selected_option = Column(Integer, nullable=True)  # None when the question was skipped
+    is_correct = Column(Boolean, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
 class Admin(Base):
     __tablename__ = "admin"
 
@@ -54,5 +81,4 @@ class Admin(Base):
     password = Column(String(255), nullable=False)
 
 
-# Correct way to create tables
-Base.metadata.create_all(bind=engine)
+# Missing tables are created by the worker at startup (ensure_schema in app/startup.py)
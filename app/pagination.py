@@ -0,0 +1,82 @@
+# app/pagination.py
+#
+# Keyset (cursor) pagination by primary key for the admin tables. Every page
+# is an index range scan of at most page_size + 1 rows, so the cost does not
+# grow with the table size or with how far the admin has paged.
+
+import os
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import func, or_
+
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = 500
+
+
+class Page(NamedTuple):
+    items: List
+    next_cursor: Optional[int]  # pass as ?after= to get the following page
+    prev_cursor: Optional[int]  # pass as ?before= to get the preceding page
+    size: int
+
+
+def clamp_page_size(size: Optional[int]) -> int:
+    if not size or size < 1:
+        return ADMIN_PAGE_SIZE
+    return min(size, MAX_PAGE_SIZE)
+
+def keyset_bounds(query, id_column, after: Optional[int] = None, before: Optional[int] = None, size: int = 0):
+    """`query` (a Query or a select()) limited to the page_size + 1 rows around the cursor."""
+    if before is not None:
+        return query.filter(id_column < before).order_by(id_column.desc()).limit(size + 1)
+    if after is not None:
+        query = query.filter(id_column > after)
+    return query.order_by(id_column).limit(size + 1)
+
+def page_from_rows(rows: List, after: Optional[int], before: Optional[int], size: int) -> Page:
+    """Build the Page from the rows fetched with keyset_bounds()."""
+    has_more = len(rows) > size
+    if before is not None:
+        rows = rows[:size][::-1]
+        next_cursor = rows[-1].id if rows else None
+        prev_cursor = rows[0].id if has_more else None
+    else:
+        rows = rows[:size]
+        next_cursor = rows[-1].id if has_more else None
+        prev_cursor = rows[0].id if after is not None and rows else None
+    return Page(rows, next_cursor, prev_cursor, size)
+
+def keyset_page(
+    query,
+    id_column,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    size: Optional[int] = None,
+) -> Page:
+    """Return one page of `query` ordered by `id_column`, starting after/before a cursor."""
+    size = clamp_page_size(size)
+    rows = keyset_bounds(query, id_column, after, before, size).all()
+    return page_from_rows(rows, after, before, size)
+
+async def keyset_page_async(
+    db,
+    statement,
+    id_column,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    size: Optional[int] = None,
+) -> Page:
+    """keyset_page() for a select() run on an AsyncSession."""
+    size = clamp_page_size(size)
+    result = await db.execute(keyset_bounds(statement, id_column, after, before, size))
+    return page_from_rows(result.all(), after, before, size)
+
+def prefix_filter(term: str, *columns):
+    """
+    Case-insensitive prefix match of `term` against any of `columns`.
+
+    Matches lower(column) LIKE 'term%', which the lower() indexes declared in
+    app/models.py can serve as a range scan.
+    """
+    escaped = term.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return or_(*(func.lower(column).like(escaped + "%", escape="\\") for column in columns))
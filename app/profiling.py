@@ -0,0 +1,352 @@
+# app/profiling.py
+#
+# Opt-in sampling profiler for individual requests.
+#
+# A request is profiled when an admin session asks for it (?profile=1 or an
+# X-Profile: 1 header) or when it is picked by PROFILE_SAMPLE_RATE. While a
+# profiled request is in flight a background thread samples the stacks of the
+# threads working on it every PROFILE_INTERVAL seconds: the event loop thread
+# while it runs the request's coroutines, and the threadpool thread running
+# its sync endpoint. Each capture is written under PROFILE_DIR as collapsed
+# stacks (wall and CPU) and as a speedscope JSON file.
+#
+# With no request selected the middleware does one substring check on the
+# query string and one pass over the header names; nothing else runs.
+
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from .storage import BASE_DIR
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, ".profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+# Captures kept on disk; the oldest are removed beyond this
+PROFILE_MAX_CAPTURES = int(os.getenv("PROFILE_MAX_CAPTURES", "200"))
+PROFILE_MAX_DEPTH = 128
+
+CAPTURE_FILE_RE = re.compile(r"^[0-9a-f]{32}\.(wall\.collapsed|cpu\.collapsed|speedscope\.json)$")
+
+
+# -------------------------
+# Captures
+# -------------------------
+class Capture:
+    """Samples for one profiled request."""
+
+    def __init__(self, scope):
+        self.id = uuid.uuid4().hex
+        self.scope = scope
+        # Created on the event loop thread, inside the request's task
+        self.loop_thread = threading.get_ident()
+        self.task = asyncio.current_task()
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.started = time.time()
+        self.wall_start = time.perf_counter()
+        self.wall_ms = 0.0
+        self.status = None
+        self.wall: Counter = Counter()  # stack -> samples
+        self.cpu: Counter = Counter()   # stack -> CPU microseconds
+        self.samples = 0
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started": self.started,
+            "wall_ms": round(self.wall_ms, 2),
+            "cpu_ms": round(sum(self.cpu.values()) / 1000, 2),
+            "samples": self.samples,
+            "interval_ms": PROFILE_INTERVAL * 1000,
+        }
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(BASE_DIR):
+        filename = os.path.relpath(filename, BASE_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+def _owner_scope(frame, scope_locals: bool):
+    """
+    The ASGI scope of the request a thread is working on, if it can be told
+    from its stack: an ASGI `scope` local on the event loop thread, or the
+    `request` argument of a sync endpoint running in the threadpool.
+    """
+    depth = 0
+    while frame is not None and depth < PROFILE_MAX_DEPTH:
+        local_vars = frame.f_locals
+        if scope_locals:
+            scope = local_vars.get("scope")
+            if isinstance(scope, dict) and "method" in scope:
+                return scope
+        request = local_vars.get("request")
+        if request is not None and hasattr(request, "scope"):
+            return request.scope
+        frame = frame.f_back
+        depth += 1
+    return None
+
+def _stack(frame) -> tuple:
+    labels = []
+    while frame is not None and len(labels) < PROFILE_MAX_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+def _await_stack(task) -> tuple:
+    """Stack of a suspended task, followed down its chain of awaited coroutines."""
+    labels = []
+    coro = task.get_coro() if task is not None else None
+    while coro is not None and len(labels) < PROFILE_MAX_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        labels.append(_frame_label(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    labels.append("[await]")
+    return tuple(labels)
+
+
+def _thread_cpu_clock(thread_id):
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+
+
+class Sampler:
+    """One background thread that samples every active capture, idle when there are none."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._active: Dict[str, Capture] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._cpu_seen: Dict[int, int] = {}
+
+    def begin(self, capture: Capture):
+        # Baseline for the loop thread, so its first sample already counts CPU
+        self._cpu_seen[capture.loop_thread] = time.thread_time_ns() // 1000
+        with self._lock:
+            self._active[capture.id] = capture
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def end(self, capture: Capture):
+        with self._lock:
+            self._active.pop(capture.id, None)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            self._wake.wait()
+            with self._lock:
+                captures = list(self._active.values())
+                if not captures:
+                    self._wake.clear()
+                    continue
+            loop_threads = {capture.loop_thread for capture in captures}
+            sampled = set()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                scope = _owner_scope(frame, scope_locals=thread_id in loop_threads)
+                if scope is None:
+                    continue
+                for capture in captures:
+                    if capture.scope is scope:
+                        self._sample(capture, thread_id, frame)
+                        sampled.add(capture.id)
+                        break
+            # Nothing is running the request: charge the wall time to what it awaits
+            for capture in captures:
+                if capture.id not in sampled:
+                    capture.wall[_await_stack(capture.task)] += 1
+                    capture.samples += 1
+            time.sleep(self.interval)
+
+    def _sample(self, capture: Capture, thread_id: int, frame):
+        stack = _stack(frame)
+        capture.wall[stack] += 1
+        capture.samples += 1
+        clock = _thread_cpu_clock(thread_id)
+        if clock is None:
+            return
+        try:
+            now = time.clock_gettime_ns(clock) // 1000
+        except OSError:
+            return
+        previous = self._cpu_seen.get(thread_id, now)
+        self._cpu_seen[thread_id] = now
+        # CPU the thread used since its previous sample, capped at two intervals
+        used = min(now - previous, int(self.interval * 2e6))
+        if used > 0:
+            capture.cpu[stack] += used
+
+
+sampler = Sampler()
+
+
+# -------------------------
+# Output
+# -------------------------
+def _collapsed(counts: Counter) -> str:
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in counts.most_common())
+
+def _speedscope(capture: Capture) -> dict:
+    frames, index = [], {}
+
+    def frame_ids(stack):
+        ids = []
+        for label in stack:
+            if label not in index:
+                index[label] = len(frames)
+                frames.append({"name": label})
+            ids.append(index[label])
+        return ids
+
+    def profile(name, counts, unit, scale):
+        stacks = list(counts.items())
+        weights = [count * scale for _, count in stacks]
+        return {
+            "type": "sampled",
+            "name": name,
+            "unit": unit,
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": [frame_ids(stack) for stack, _ in stacks],
+            "weights": weights,
+        }
+
+    title = f"{capture.method} {capture.path}"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": title,
+        "exporter": "gesturelab-profiler",
+        "activeProfileIndex": 0,
+        "profiles": [
+            profile(f"{title} (wall)", capture.wall, "milliseconds", PROFILE_INTERVAL * 1000),
+            profile(f"{title} (cpu)", capture.cpu, "microseconds", 1),
+        ],
+        "shared": {"frames": frames},
+    }
+
+def write_capture(capture: Capture, directory: str = PROFILE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, capture.id)
+    with open(base + ".wall.collapsed", "w") as f:
+        f.write(_collapsed(capture.wall))
+    with open(base + ".cpu.collapsed", "w") as f:
+        f.write(_collapsed(capture.cpu))
+    with open(base + ".speedscope.json", "w") as f:
+        json.dump(_speedscope(capture), f)
+    # Summary last: the listing only shows captures whose files are complete
+    with open(base + ".summary.json", "w") as f:
+        json.dump(capture.summary(), f)
+    prune_captures(directory)
+
+def prune_captures(directory: str = PROFILE_DIR, keep: int = PROFILE_MAX_CAPTURES):
+    summaries = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".summary.json")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in summaries[:max(len(summaries) - keep, 0)]:
+        capture_id = entry.name.split(".", 1)[0]
+        for suffix in (".summary.json", ".wall.collapsed", ".cpu.collapsed", ".speedscope.json"):
+            try:
+                os.remove(os.path.join(directory, capture_id + suffix))
+            except FileNotFoundError:
+                pass
+
+def list_captures(directory: str = PROFILE_DIR, limit: int = 50) -> List[dict]:
+    """Captured requests from every worker, slowest first."""
+    if not os.path.isdir(directory):
+        return []
+    captures = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".summary.json"):
+            try:
+                with open(entry.path) as f:
+                    captures.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    captures.sort(key=lambda capture: capture["wall_ms"], reverse=True)
+    return captures[:limit]
+
+def capture_file(name: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    """Path of a downloadable capture file, or None for anything else."""
+    if not CAPTURE_FILE_RE.match(name):
+        return None
+    path = os.path.join(directory, name)
+    return path if os.path.isfile(path) else None
+
+
+# -------------------------
+# Middleware
+# -------------------------
+def _flagged(scope) -> bool:
+    if b"profile=1" in scope["query_string"]:
+        return True
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value == b"1"
+    return False
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware; must sit inside SessionMiddleware so the admin flag
+    can be checked against the session.
+    """
+
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    def _selected(self, scope) -> bool:
+        if _flagged(scope) and scope.get("session", {}).get("is_admin"):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        capture = Capture(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                capture.status = message["status"]
+            await send(message)
+
+        sampler.begin(capture)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.end(capture)
+            capture.wall_ms = (time.perf_counter() - capture.wall_start) * 1000
+            capture.scope = capture.task = None
+            # The response has been sent; write the files off the event loop
+            try:
+                await asyncio.to_thread(write_capture, capture)
+            except OSError as e:
+                print(f"Error writing profile {capture.id}: {e}")
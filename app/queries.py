@@ -0,0 +1,174 @@
+# app/queries.py
+#
+# Read-only projections for the listing pages. Each query selects only the
+# columns its template reads and returns immutable NamedTuples that are not
+# attached to the Session: no identity map, no change tracking, and cheap to
+# keep in the content cache.
+
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import User, Lesson, Quiz
+from .pagination import Page, keyset_page, keyset_page_async, prefix_filter
+
+
+class LessonCard(NamedTuple):
+    """A lesson as shown on the per-level lesson pages."""
+    name: str
+    image: str
+    heading: str
+    description: str
+
+
+class QuizCard(NamedTuple):
+    """A quiz question as shown on the per-level quiz pages (no answer)."""
+    id: int
+    question_text: Optional[str]
+    question_image: Optional[str]
+    option1_text: Optional[str]
+    option2_text: Optional[str]
+    option3_text: Optional[str]
+    option4_text: Optional[str]
+    option1_image: Optional[str]
+    option2_image: Optional[str]
+    option3_image: Optional[str]
+    option4_image: Optional[str]
+
+
+class LessonRow(NamedTuple):
+    """A lesson as listed in the admin lessons table."""
+    id: int
+    sign_level: str
+    name: str
+    image: str
+    heading: str
+    description: str
+
+
+class QuizRow(NamedTuple):
+    """A quiz as listed in the admin quizzes table."""
+    id: int
+    level: str
+    question_text: Optional[str]
+    question_image: Optional[str]
+    option1_text: Optional[str]
+    option2_text: Optional[str]
+    option3_text: Optional[str]
+    option4_text: Optional[str]
+    option1_image: Optional[str]
+    option2_image: Optional[str]
+    option3_image: Optional[str]
+    option4_image: Optional[str]
+    correct_option: int
+
+
+class UserRow(NamedTuple):
+    """A user as listed on the admin dashboard (never the password hash)."""
+    id: int
+    email: str
+    username: str
+
+
+def _columns(entity, record_type):
+    return [getattr(entity, field) for field in record_type._fields]
+
+def _page_of(record_type, page: Page) -> Page:
+    return page._replace(items=[record_type._make(row) for row in page.items])
+
+
+# -------------------------
+# Level pages
+# -------------------------
+def _lesson_cards_statement(level: str):
+    return (
+        select(*_columns(Lesson, LessonCard))
+        .where(Lesson.sign_level == level)
+        .order_by(Lesson.id)
+    )
+
+def _quiz_cards_statement(level: str):
+    return (
+        select(*_columns(Quiz, QuizCard))
+        .where(Quiz.level == level)
+        .order_by(Quiz.id)
+    )
+
+def lesson_cards(db: Session, level: str) -> List[LessonCard]:
+    return [LessonCard._make(row) for row in db.execute(_lesson_cards_statement(level))]
+
+def quiz_cards(db: Session, level: str) -> List[QuizCard]:
+    return [QuizCard._make(row) for row in db.execute(_quiz_cards_statement(level))]
+
+
+# -------------------------
+# Admin tables
+# -------------------------
+def lesson_rows_page(db: Session, **cursor) -> Page:
+    query = db.query(*_columns(Lesson, LessonRow))
+    return _page_of(LessonRow, keyset_page(query, Lesson.id, **cursor))
+
+def quiz_rows_page(db: Session, **cursor) -> Page:
+    query = db.query(*_columns(Quiz, QuizRow))
+    return _page_of(QuizRow, keyset_page(query, Quiz.id, **cursor))
+
+def user_rows_page(db: Session, q: Optional[str] = None, **cursor) -> Page:
+    query = db.query(*_columns(User, UserRow))
+    if q:
+        query = query.filter(prefix_filter(q, User.username, User.email))
+    return _page_of(UserRow, keyset_page(query, User.id, **cursor))
+
+
+# -------------------------
+# Async variants (ASYNC_ROUTES)
+# -------------------------
+# Same statements and record types, run on an AsyncSession.
+async def lesson_cards_async(db: AsyncSession, level: str) -> List[LessonCard]:
+    result = await db.execute(_lesson_cards_statement(level))
+    return [LessonCard._make(row) for row in result]
+
+async def quiz_cards_async(db: AsyncSession, level: str) -> List[QuizCard]:
+    result = await db.execute(_quiz_cards_statement(level))
+    return [QuizCard._make(row) for row in result]
+
+async def lesson_rows_page_async(db: AsyncSession, **cursor) -> Page:
+    statement = select(*_columns(Lesson, LessonRow))
+    return _page_of(LessonRow, await keyset_page_async(db, statement, Lesson.id, **cursor))
+
+async def quiz_rows_page_async(db: AsyncSession, **cursor) -> Page:
+    statement = select(*_columns(Quiz, QuizRow))
+    return _page_of(QuizRow, await keyset_page_async(db, statement, Quiz.id, **cursor))
+
+def _user_rows_statement(q: Optional[str]):
+    statement = select(*_columns(User, UserRow))
+    if q:
+        statement = statement.where(prefix_filter(q, User.username, User.email))
+    return statement
+
+async def user_rows_page_async(db: AsyncSession, q: Optional[str] = None, **cursor) -> Page:
+    return _page_of(UserRow, await keyset_page_async(db, _user_rows_statement(q), User.id, **cursor))
+
+
+# -------------------------
+# Identity checks
+# -------------------------
+def identity_taken(
+    db: Session, username: str, email: str, exclude_user_id: Optional[int] = None
+) -> bool:
+    """
+    Whether another user already has `username` or `email`, compared
+    case-insensitively like /api/availability. The admin's reserved names are
+    checked against app/admin_identity.py, not here.
+    """
+    # Served by the lower() indexes declared in app/models.py
+    statement = select(User.id).where(
+        or_(
+            func.lower(User.username) == username.strip().lower(),
+            func.lower(User.email) == email.strip().lower(),
+        )
+    )
+    if exclude_user_id is not None:
+        statement = statement.where(User.id != exclude_user_id)
+    return db.execute(statement.limit(1)).first() is not None
@@ -0,0 +1,172 @@
+# app/query_budget.py
+#
+# Query budgets: every route declares how many SQL statements one request
+# may execute, and QueryBudgetMiddleware (enabled with QUERY_BUDGETS=1 in
+# development and CI) records the statements of each request and reports the
+# routes that exceed their budget or repeat a statement (the N+1 pattern).
+# benchmarks/check_query_budgets.py drives every route and fails on them.
+#
+#   @app.get("/dashboard")
+#   @query_budget(2)
+#   def dashboard_page(...): ...
+#
+#   with record_queries() as recorder:
+#       client.get("/dashboard")
+#   recorder.check(QueryBudget(2), "/dashboard")   # raises QueryBudgetExceeded
+
+import contextvars
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import event
+
+QUERY_BUDGETS = os.getenv("QUERY_BUDGETS", "0") == "1"
+
+
+class QueryBudget(NamedTuple):
+    max_queries: int
+    # For routes that send batches of one statement (bulk import): repeats
+    # are allowed and each distinct statement counts once
+    allow_repeats: bool = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries: int, allow_repeats: bool = False):
+    """Declare the statement budget of a route function."""
+    def decorator(func):
+        func.__query_budget__ = QueryBudget(max_queries, allow_repeats)
+        return func
+    return decorator
+
+def budget_of(endpoint) -> Optional[QueryBudget]:
+    return getattr(endpoint, "__query_budget__", None)
+
+
+# -------------------------
+# Recording
+# -------------------------
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+def fingerprint(statement: str) -> str:
+    """Statement text with literals, parameter lists and whitespace normalised."""
+    statement = _LITERAL_RE.sub("?", statement)
+    statement = _IN_LIST_RE.sub("(?)", statement)
+    return _SPACE_RE.sub(" ", statement).strip()
+
+
+class QueryRecorder:
+    """Statements executed in one context (a request or a `with` block)."""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeats(self) -> List[str]:
+        counts = Counter(fingerprint(statement) for statement in self.statements)
+        return [statement for statement, count in counts.items() if count > 1]
+
+    def violations(self, budget: QueryBudget) -> List[str]:
+        problems = []
+        if budget.allow_repeats:
+            count = len({fingerprint(statement) for statement in self.statements})
+        else:
+            count = self.count
+            problems.extend(f"repeated statement: {statement}" for statement in self.repeats())
+        if count > budget.max_queries:
+            problems.insert(0, f"{count} queries, budget is {budget.max_queries}")
+        return problems
+
+    def check(self, budget: QueryBudget, label: str = "block"):
+        problems = self.violations(budget)
+        if problems:
+            raise QueryBudgetExceeded(f"{label}: " + "; ".join(problems))
+
+
+_recorder: contextvars.ContextVar = contextvars.ContextVar("query_recorder", default=None)
+_instrumented = set()
+
+def instrument_engine(engine):
+    """Route statements executed on `engine` to the active recorder, if any."""
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        recorder = _recorder.get()
+        if recorder is not None:
+            recorder.statements.append(statement)
+
+@contextmanager
+def record_queries(engine=None):
+    """Record the statements executed in this context (and threads it hands work to)."""
+    if engine is None:
+        from .database import engine
+    instrument_engine(engine)
+    recorder = QueryRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+# -------------------------
+# Middleware
+# -------------------------
+class BudgetReport:
+    """What QueryBudgetMiddleware saw, for checks to assert on."""
+
+    def __init__(self):
+        self.violations = {}  # "METHOD /route" -> messages
+        self.last = None      # ("METHOD /route", recorder) of the latest request
+
+    def clear(self):
+        self.violations.clear()
+        self.last = None
+
+
+budget_report = BudgetReport()
+
+
+class QueryBudgetMiddleware:
+    """
+    Records every request's statements and checks them against the budget of
+    the route that served it. Violations are printed and collected in
+    `budget_report`.
+    """
+
+    def __init__(self, app, engine=None):
+        self.app = app
+        self.engine = engine
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with record_queries(self.engine) as recorder:
+            await self.app(scope, receive, send)
+        route = scope.get("route")
+        if route is None:
+            return
+        label = f"{scope['method']} {route.path}"
+        budget_report.last = (label, recorder)
+        budget = budget_of(route.endpoint)
+        if budget is None:
+            problems = [f"no query budget declared ({recorder.count} queries)"]
+        else:
+            problems = recorder.violations(budget)
+        if problems:
+            budget_report.violations.setdefault(label, []).extend(problems)
+            print(f"Query budget: {label}: " + "; ".join(problems))
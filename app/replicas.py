@@ -0,0 +1,181 @@
+# app/replicas.py
+#
+# Read-replica routing. With DATABASE_REPLICA_URLS set, GET/HEAD requests read
+# from one of the replica engines and everything else uses the primary:
+#
+#   DATABASE_REPLICA_URLS=postgresql://...@replica1/GestureLab,postgresql://...@replica2/GestureLab
+#   REPLICA_STRATEGY=round_robin      # or least_busy (fewest checked-out connections)
+#
+# A background thread probes every replica each REPLICA_HEALTH_INTERVAL
+# seconds, and a connection error marks a replica down at once; requests
+# fall back to the primary while no replica is healthy. After a write
+# request the session cookie carries a "primary until" timestamp, so the
+# same browser reads its own writes from the primary for REPLICA_STICKY_SECONDS
+# while the replicas catch up.
+#
+# Locally, two SQLite files work: copy the primary file to the replica path.
+
+import itertools
+import os
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import create_engine, event, text
+
+from .database import engine_options
+
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+REPLICA_STRATEGY = os.getenv("REPLICA_STRATEGY", "round_robin")
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+READ_METHODS = ("GET", "HEAD")
+STICKY_KEY = "primary_until"
+
+
+class Replica:
+    """One read replica: its sync engine, the async one on demand, and its health."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url, **engine_options(url))
+        self.healthy = True
+        self._async_engine = None
+
+        @event.listens_for(self.engine, "handle_error")
+        def _connection_error(context):
+            # Lost or refused connections take the replica out until the next good probe
+            if context.is_disconnect or context.connection is None:
+                self.mark(False, context.original_exception)
+
+    @property
+    def async_engine(self):
+        if self._async_engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+            from .async_database import async_engine_options, async_url
+
+            url = async_url(self.url)
+            self._async_engine = create_async_engine(url, **async_engine_options(url))
+        return self._async_engine
+
+    def busy(self) -> int:
+        """Connections currently checked out of this replica's pools."""
+        engines = [self.engine]
+        if self._async_engine is not None:
+            engines.append(self._async_engine.sync_engine)
+        return sum(engine.pool.checkedout() for engine in engines if hasattr(engine.pool, "checkedout"))
+
+    def probe(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception as e:
+            self.mark(False, e)
+            return False
+        self.mark(True)
+        return True
+
+    def mark(self, healthy: bool, error: Optional[BaseException] = None):
+        if healthy != self.healthy:
+            state = "back up" if healthy else (f"down ({error})" if error else "down")
+            print(f"Read replica {self.engine.url.render_as_string(hide_password=True)} {state}")
+        self.healthy = healthy
+
+
+class ReplicaSet:
+    """Picks the replica for a read; None means use the primary."""
+
+    def __init__(self, urls: List[str], strategy: str = REPLICA_STRATEGY, interval: float = REPLICA_HEALTH_INTERVAL):
+        if strategy not in ("round_robin", "least_busy"):
+            raise ValueError(f"Unknown REPLICA_STRATEGY: {strategy}")
+        self.replicas = [Replica(url) for url in urls]
+        self.strategy = strategy
+        self.interval = interval
+        self._next = itertools.count()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.strategy == "least_busy":
+            return min(healthy, key=Replica.busy)
+        return healthy[next(self._next) % len(healthy)]
+
+    def engines(self, include_async: bool = False):
+        """Replica engines to instrument; async ones as their sync_engine."""
+        engines = [replica.engine for replica in self.replicas]
+        if include_async:
+            engines += [replica.async_engine.sync_engine for replica in self.replicas]
+        return engines
+
+    def healthy_count(self) -> int:
+        return sum(replica.healthy for replica in self.replicas)
+
+    def check(self):
+        for replica in self.replicas:
+            replica.probe()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self.replicas and self._thread is None:
+            self.check()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    async def dispose_async(self):
+        for replica in self.replicas:
+            if replica._async_engine is not None:
+                await replica._async_engine.dispose()
+                replica._async_engine = None
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+
+
+def _discard_inherited_connections():
+    for replica in replicas.replicas:
+        replica.engine.dispose(close=False)
+        if replica._async_engine is not None:
+            replica._async_engine.sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_discard_inherited_connections)
+
+
+# -------------------------
+# Request routing
+# -------------------------
+def read_replica_for(request) -> Optional[Replica]:
+    """
+    The replica that should serve this request's reads, or None for the
+    primary. Write requests also start the read-your-writes window.
+    """
+    if not replicas:
+        return None
+    if request.method not in READ_METHODS:
+        request.session[STICKY_KEY] = time.time() + REPLICA_STICKY_SECONDS
+        return None
+    sticky_until = request.session.get(STICKY_KEY)
+    if sticky_until is not None:
+        if sticky_until > time.time():
+            return None
+        # Window over; read from the replicas again
+        del request.session[STICKY_KEY]
+    return replicas.pick()
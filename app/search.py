@@ -0,0 +1,494 @@
+# app/search.py
+#
+# Full-text lesson search (/search) over an in-process inverted index.
+#
+# Lesson names, headings and descriptions are tokenized into lowercase words;
+# every word has a postings list of (lesson, impact) ordered by impact, where
+# the impact is the field-weighted term frequency (a name match counts most).
+# A query matches lessons containing all of its words, the last one as a
+# prefix so results follow the user's typing, and is ranked by the sum of
+# idf * impact. Multi-word queries with a fairly specific word intersect the
+# postings as sets and score the matches; otherwise postings are walked
+# best-first and stop as soon as no unseen lesson can reach the top results,
+# so common words stay cheap. Repeated queries come from a result cache.
+#
+# The lesson write handlers update the index in place. Every
+# SEARCH_REFRESH_SECONDS a background thread checks whether the shared
+# lesson version (app/cache.py) has moved, i.e. some worker wrote or imported
+# lessons, and if so compares a signature of the lessons
+# table (count plus a sum of per-lesson hashes of the indexed fields) with the
+# index, rebuilding on a mismatch. Without a version change the table is still
+# verified every SEARCH_VERIFY_SECONDS, for workers that do not share the
+# version file. The index is snapshotted to SEARCH_SNAPSHOT together with its
+# signature, so a starting worker loads it instead of tokenizing every lesson.
+
+import bisect
+import hashlib
+import heapq
+import itertools
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+
+from .cache import TTLCache, lesson_version
+from .database import SessionLocal
+from .models import Lesson
+from .storage import BASE_DIR
+
+SEARCH_SNAPSHOT = os.getenv("SEARCH_SNAPSHOT", os.path.join(BASE_DIR, ".search_index.pickle"))
+SEARCH_REFRESH_SECONDS = float(os.getenv("SEARCH_REFRESH_SECONDS", "30"))
+SEARCH_VERIFY_SECONDS = float(os.getenv("SEARCH_VERIFY_SECONDS", "600"))
+SEARCH_MAX_RESULTS = 50
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+# Vocabulary words a trailing prefix may expand to
+SEARCH_MAX_EXPANSIONS = 16
+# Multi-word queries intersect their words' lessons when the most specific
+# word is in at most SEARCH_INTERSECT_MAX of them, and score every match when
+# there are at most SEARCH_SCAN_MAX; otherwise postings are walked best-first
+SEARCH_INTERSECT_MAX = int(os.getenv("SEARCH_INTERSECT_MAX", "20000"))
+SEARCH_SCAN_MAX = int(os.getenv("SEARCH_SCAN_MAX", "5000"))
+
+SNAPSHOT_FORMAT = 2
+FIELD_WEIGHTS = (("name", 3.0), ("heading", 2.0), ("description", 1.0))
+# Words that only complete the last query term rank a little below exact ones
+PREFIX_PENALTY = 0.8
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class SearchDocument(NamedTuple):
+    """The lesson fields a search result shows."""
+    id: int
+    sign_level: str
+    name: str
+    image: str
+    heading: str
+    description: str
+
+
+class SearchHit(NamedTuple):
+    lesson: SearchDocument
+    score: float
+
+
+_HASH_MASK = (1 << 64) - 1
+
+
+def _signature_of(doc) -> Tuple[int, int]:
+    """(1, 64-bit hash of every stored field); summed over the lessons."""
+    digest = hashlib.blake2b("\x1f".join(map(str, doc)).encode("utf-8"), digest_size=8).digest()
+    return (1, int.from_bytes(digest, "big"))
+
+
+def _combine(signature, doc_signature, sign: int = 1) -> Tuple[int, int]:
+    count, hashes = signature
+    return (count + sign * doc_signature[0], (hashes + sign * doc_signature[1]) & _HASH_MASK)
+
+
+class Postings:
+    """Lessons containing one word: lesson -> impact, plus a best-first order built on demand."""
+
+    __slots__ = ("impacts", "_order", "_order_impacts")
+
+    def __init__(self):
+        self.impacts: Dict[int, float] = {}
+        self._order = None
+        self._order_impacts = None
+
+    def ordered(self) -> Tuple[array, array]:
+        if self._order is None:
+            ranked = sorted(self.impacts.items(), key=lambda item: -item[1])
+            self._order = array("q", (doc_id for doc_id, _ in ranked))
+            self._order_impacts = array("d", (impact for _, impact in ranked))
+        return self._order, self._order_impacts
+
+    def changed(self):
+        self._order = self._order_impacts = None
+
+    def __getstate__(self):
+        # Only the ordered arrays: compact, and the dict rebuilds from them in C
+        return self.ordered()
+
+    def __setstate__(self, state):
+        self._order, self._order_impacts = state
+        self.impacts = dict(zip(self._order, self._order_impacts))
+
+
+class LessonIndex:
+    def __init__(self, cache_size: int = SEARCH_CACHE_SIZE):
+        self.docs: Dict[int, SearchDocument] = {}
+        self.postings: Dict[str, Postings] = {}
+        self.signature = (0, 0)  # lesson count, sum of the lessons' hashes (mod 2**64)
+        self._vocabulary: Optional[List[str]] = None
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = None
+        self.dirty = False  # changed since the last snapshot
+        self._verified = (None, 0.0)  # lesson version and time of the last table check
+        # Results of repeated queries (typeahead), keyed by the index generation
+        self.generation = 0
+        self.results = TTLCache(maxsize=cache_size, ttl=3600)
+
+    # -------------------------
+    # Indexing
+    # -------------------------
+    def _terms(self, doc: SearchDocument) -> Dict[str, float]:
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(getattr(doc, field)):
+                weights[token] = weights.get(token, 0.0) + weight
+        # Saturating term frequency: the tenth repeat adds little
+        return {token: tf / (tf + 1.2) for token, tf in weights.items()}
+
+    def _add(self, doc: SearchDocument):
+        for token, impact in self._terms(doc).items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = Postings()
+                self._vocabulary = None
+            postings.impacts[doc.id] = impact
+            postings.changed()
+        self.docs[doc.id] = doc
+        self.signature = _combine(self.signature, _signature_of(doc))
+
+    def _remove(self, lesson_id: int):
+        doc = self.docs.pop(lesson_id, None)
+        if doc is None:
+            return
+        for token in self._terms(doc):
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.impacts.pop(lesson_id, None)
+            postings.changed()
+            if not postings.impacts:
+                del self.postings[token]
+                self._vocabulary = None
+        self.signature = _combine(self.signature, _signature_of(doc), -1)
+
+    def upsert(self, doc: SearchDocument):
+        """Index a lesson that was added or updated."""
+        with self._lock:
+            self._remove(doc.id)
+            self._add(doc)
+            self.dirty = True
+            self.generation += 1
+
+    def delete(self, lesson_id: int):
+        with self._lock:
+            self._remove(lesson_id)
+            self.dirty = True
+            self.generation += 1
+
+    # -------------------------
+    # Loading
+    # -------------------------
+    def rebuild(self):
+        """Index every lesson from the database and snapshot the result."""
+        db = SessionLocal()
+        try:
+            columns = [getattr(Lesson, field) for field in SearchDocument._fields]
+            rows = db.execute(select(*columns)).all()
+        finally:
+            db.close()
+        self.replace(SearchDocument._make(row) for row in rows)
+        self.save()
+
+    def replace(self, documents):
+        """Swap in an index of `documents`, built without holding up searches."""
+        fresh = LessonIndex(cache_size=0)
+        for doc in documents:
+            fresh._add(doc)
+        with self._lock:
+            self.docs, self.postings, self.signature = fresh.docs, fresh.postings, fresh.signature
+            self._vocabulary = None
+            self.dirty = True
+            self.generation += 1
+
+    def database_signature(self) -> Tuple[int, int]:
+        """Signature of the lessons table; reads the indexed columns of every lesson."""
+        signature = (0, 0)
+        db = SessionLocal()
+        try:
+            columns = [getattr(Lesson, field) for field in SearchDocument._fields]
+            for row in db.execute(select(*columns)):
+                signature = _combine(signature, _signature_of(row))
+        finally:
+            db.close()
+        return signature
+
+    def save(self, path: str = SEARCH_SNAPSHOT):
+        with self._lock:
+            if not self.dirty:
+                return
+            state = (SNAPSHOT_FORMAT, self.signature, self.docs, self.postings)
+            self.dirty = False
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error writing search snapshot: {e}")
+
+    def load(self, path: str = SEARCH_SNAPSHOT) -> bool:
+        """Load the snapshot if there is one; True when it was read."""
+        try:
+            with open(path, "rb") as f:
+                version, signature, docs, postings = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            return False
+        if version != SNAPSHOT_FORMAT:
+            return False
+        with self._lock:
+            self.signature, self.docs, self.postings = signature, docs, postings
+            self._vocabulary = None
+            self.dirty = False
+            self.generation += 1
+        return True
+
+    def sync(self):
+        """Rebuild when the table no longer matches the index (another worker wrote)."""
+        # Read before the table, so a write that lands meanwhile is checked next time
+        version = lesson_version.current()
+        checked_version, checked_at = self._verified
+        if version != checked_version or time.monotonic() - checked_at >= SEARCH_VERIFY_SECONDS:
+            if self.database_signature() != self.signature:
+                self.rebuild()
+            self._verified = (version, time.monotonic())
+        self.save()
+
+    # -------------------------
+    # Background refresh
+    # -------------------------
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(SEARCH_REFRESH_SECONDS)
+            self._wake.clear()
+            if self._stop:
+                break
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error refreshing the search index: {e}")
+
+    def prepare(self):
+        """
+        Make the index match the table without starting the refresh thread:
+        keep what is loaded (e.g. inherited from the pre-fork master) or load
+        the snapshot, and rebuild when the table has changed since.
+        """
+        # A snapshot that still matches the table spares the full rebuild
+        version = lesson_version.current()
+        if not ((self.docs or self.load()) and self.database_signature() == self.signature):
+            self.rebuild()
+        self._verified = (version, time.monotonic())
+
+    def start(self):
+        try:
+            self.prepare()
+        except Exception as e:
+            print(f"Error building the search index: {e}")
+        if self._thread is None:
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="search-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.save()
+
+    def request_sync(self):
+        """Check the table soon, e.g. after a bulk import that bypassed upsert()."""
+        self._wake.set()
+
+    # -------------------------
+    # Querying
+    # -------------------------
+    def _expansions(self, prefix: str) -> List[Tuple[str, float]]:
+        """Vocabulary words starting with `prefix`, most common first, with their weight."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + "\U0010ffff", start)
+        words = vocabulary[start:end]
+        if len(words) > SEARCH_MAX_EXPANSIONS:
+            words = sorted(words, key=lambda word: -len(self.postings[word].impacts))[:SEARCH_MAX_EXPANSIONS]
+        return [(word, 1.0 if word == prefix else PREFIX_PENALTY) for word in words]
+
+    def search(self, query: str, limit: int = SEARCH_MAX_RESULTS) -> List[SearchHit]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        key = (tuple(tokens), limit, self.generation)
+        return self.results.get_or_load(key, lambda: self._search(tokens, limit))
+
+    def _search(self, tokens: List[str], limit: int) -> List[SearchHit]:
+        with self._lock:
+            total = len(self.docs) or 1
+            # Each query term is a list of (postings, weight): one exact word,
+            # or the words the trailing prefix expands to
+            terms = []
+            for token in dict.fromkeys(tokens):
+                if token == tokens[-1]:
+                    choices = self._expansions(token)
+                else:
+                    choices = [(token, 1.0)] if token in self.postings else []
+                if not choices:
+                    return []
+                terms.append([
+                    (self.postings[word], weight * math.log(1 + total / len(self.postings[word].impacts)))
+                    for word, weight in choices
+                ])
+            return self._top(terms, limit)
+
+    def _top(self, terms, limit: int) -> List[SearchHit]:
+        matches = _matches(terms) if len(terms) > 1 else None
+        if matches is not None and len(matches) <= SEARCH_SCAN_MAX:
+            ranked = self._scan(terms, matches, limit)
+        else:
+            ranked = self._threshold(terms, limit)
+        return [SearchHit(self.docs[doc_id], score) for doc_id, score in ranked]
+
+    @staticmethod
+    def _scan(terms, matches: set, limit: int) -> List[Tuple[int, float]]:
+        # Score every match; intersecting each word with the matches runs in C
+        scores = dict.fromkeys(matches, 0.0)
+        for choices in terms:
+            best: Dict[int, float] = {}
+            for postings, weight in choices:
+                impacts = postings.impacts
+                for doc_id in impacts.keys() & matches:
+                    value = impacts[doc_id] * weight
+                    if value > best.get(doc_id, 0.0):
+                        best[doc_id] = value
+            for doc_id, value in best.items():
+                scores[doc_id] += value
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    @staticmethod
+    def _threshold(terms, limit: int) -> List[Tuple[int, float]]:
+        # Threshold algorithm: advance the term whose next lesson could score
+        # most, complete each new lesson's score by lookup in the other terms,
+        # and stop once the terms' next values together cannot reach the top
+        # results, or a term runs out (every match contains all terms).
+        # Every other step walks the shortest term instead, so a sparse
+        # intersection ends after about twice that term's length.
+        cursors = [_TermCursor(choices) for choices in terms]
+        shortest = min(cursors, key=_TermCursor.remaining)
+        seen = set()
+        ranked: List[Tuple[float, int]] = []  # best `limit` as (score, -id), ascending
+        for step in itertools.count():
+            cursor = shortest if step % 2 else max(cursors, key=_TermCursor.frontier)
+            if cursor.exhausted():
+                break
+            if len(ranked) >= limit and sum(c.frontier() for c in cursors) <= ranked[0][0]:
+                break
+            value, doc_id = cursor.pop()
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            score = value
+            for other in cursors:
+                if other is not cursor:
+                    impact = other.score(doc_id)
+                    if not impact:
+                        break
+                    score += impact
+            else:
+                entry = (score, -doc_id)
+                if len(ranked) < limit:
+                    bisect.insort(ranked, entry)
+                elif entry > ranked[0]:
+                    ranked.pop(0)
+                    bisect.insort(ranked, entry)
+            if any(c.exhausted() for c in cursors):
+                break
+
+        return [(-neg_id, score) for score, neg_id in reversed(ranked)]
+
+
+def _term_size(choices) -> int:
+    return sum(len(postings.impacts) for postings, _ in choices)
+
+
+def _matches(terms) -> Optional[set]:
+    """
+    Lessons containing every term, or None when even the most specific term
+    is too common for set intersections to beat walking the postings.
+    """
+    terms = sorted(terms, key=_term_size)
+    if _term_size(terms[0]) > SEARCH_INTERSECT_MAX:
+        return None
+    matches = set().union(*(postings.impacts.keys() for postings, _ in terms[0]))
+    for choices in terms[1:]:
+        # dict_keys & set iterates the smaller side
+        matches = set().union(*(postings.impacts.keys() & matches for postings, _ in choices))
+        if not matches:
+            break
+    return matches
+
+
+class _TermCursor:
+    """Best-first walk over one query term: a word, or all words of a prefix merged."""
+
+    __slots__ = ("choices", "lists", "positions", "heap")
+
+    def __init__(self, choices):
+        self.choices = choices  # (postings, weight)
+        self.lists = []
+        self.heap = []
+        for postings, weight in choices:
+            order, impacts = postings.ordered()
+            self.heap.append((-impacts[0] * weight, len(self.lists)))
+            self.lists.append((order, impacts, weight))
+        heapq.heapify(self.heap)
+        self.positions = [0] * len(self.lists)
+
+    def remaining(self) -> int:
+        return sum(len(order) - position for (order, _, _), position in zip(self.lists, self.positions))
+
+    def exhausted(self) -> bool:
+        return not self.heap
+
+    def frontier(self) -> float:
+        """Upper bound on what this term adds for any lesson not popped yet."""
+        return -self.heap[0][0] if self.heap else 0.0
+
+    def pop(self) -> Tuple[float, int]:
+        value, number = heapq.heappop(self.heap)
+        order, impacts, weight = self.lists[number]
+        position = self.positions[number]
+        self.positions[number] = position + 1
+        if position + 1 < len(order):
+            heapq.heappush(self.heap, (-impacts[position + 1] * weight, number))
+        # Popped first from this term, so it is the lesson's best expansion
+        return -value, order[position]
+
+    def score(self, doc_id: int) -> float:
+        """What this term adds for `doc_id`; 0.0 when the lesson lacks it."""
+        best = 0.0
+        for postings, weight in self.choices:
+            impact = postings.impacts.get(doc_id)
+            if impact is not None and impact * weight > best:
+                best = impact * weight
+        return best
+
+lesson_index = LessonIndex()
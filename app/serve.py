@@ -0,0 +1,251 @@
+# app/serve.py
+#
+# Pre-fork launcher: one master process imports and warms the app, then forks
+# uvicorn workers that share the listening socket.
+#
+#   python -m app.serve --workers 4 --port 8000 --max-requests 10000
+#
+# The master does the one-off work before forking: waiting for the database,
+# creating missing tables and the default admin, compiling every template,
+# and loading the per-level content cache and the search index. Workers
+# inherit that state copy-on-write (gc.freeze() keeps the collector from
+# touching those pages), so their own startup only re-checks it. Pools
+# inherited through fork are discarded in the child (see
+# _discard_inherited_connections in app/database.py), and the master closes
+# its connections before every fork.
+#
+# Signals to the master:
+#   HUP        graceful reload: re-warm, fork new workers, then stop the old
+#              ones once they finish their requests (code changes need a restart)
+#   TTIN/TTOU  one worker more / less
+#   TERM/INT   graceful shutdown
+#
+# A worker that has served --max-requests requests (plus up to
+# --max-requests-jitter, so they do not all restart at once) exits and is
+# replaced, which bounds slow memory growth.
+
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import sys
+import time
+import traceback
+
+GRACEFUL_TIMEOUT = float(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30"))
+# A worker dying sooner than this after its fork is respawned with a delay
+# (e.g. the database is down), so the master does not spin
+MIN_WORKER_LIFETIME = 1.0
+MASTER_SIGNALS = (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD)
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+# -------------------------
+# Master-side warm-up
+# -------------------------
+def preload():
+    """Import the app and build the state every worker would otherwise build itself."""
+    from .database import engine
+    from .main import app, init_admin, templates, warm_content_cache
+    from .replicas import replicas
+    from .search import lesson_index
+    from .startup import ensure_schema, run_startup, wait_for_database
+    from .templating import precompile_templates
+
+    run_startup(
+        setup=[
+            ("wait_for_database", lambda: wait_for_database(engine)),
+            ("ensure_schema", lambda: ensure_schema(engine)),
+            ("init_admin", init_admin),
+        ],
+        warmups=[
+            ("precompile_templates", lambda: precompile_templates(templates)),
+            ("warm_content_cache", warm_content_cache),
+            ("load_search_index", lesson_index.prepare),
+        ],
+        label="Master",
+    )
+    release_connections(engine, replicas)
+    return app
+
+
+def release_connections(engine, replicas):
+    """Close the master's pooled connections so no socket is shared with a worker."""
+    engine.dispose()
+    for replica in replicas.replicas:
+        replica.engine.dispose()
+
+
+# -------------------------
+# Workers
+# -------------------------
+def run_worker(app, sock: socket.socket, args) -> int:
+    """Serve in this (forked) process until stopped or recycled; returns the exit code."""
+    import uvicorn
+
+    for signum in MASTER_SIGNALS:
+        signal.signal(signum, signal.SIG_DFL)
+    max_requests = args.max_requests + random.randint(0, args.max_requests_jitter) if args.max_requests else None
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+        proxy_headers=True,
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return 0 if server.started else 3
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.target = args.workers
+        self.workers = {}  # pid -> fork time
+        self.retiring = {}  # pid -> deadline for a graceful stop
+        self.signals = []
+        self.respawn_delay = 0.0
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = run_worker(self.app, self.sock, self.args)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+
+    def retire(self, pid: int):
+        """Ask a worker to finish its requests and exit; killed after the graceful timeout."""
+        self.workers.pop(pid, None)
+        self.retiring[pid] = time.monotonic() + self.args.graceful_timeout + 5
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.retiring.pop(pid)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            if self.retiring.pop(pid, None) is not None or started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            lifetime = time.monotonic() - started
+            if code == 0:
+                print(f"Worker {pid} recycled after max requests")
+            else:
+                print(f"Worker {pid} exited with {code} after {lifetime:.1f}s")
+            # Back off while workers keep dying right after they start
+            self.respawn_delay = min(max(self.respawn_delay * 2, 0.5), 10.0) if lifetime < MIN_WORKER_LIFETIME else 0.0
+
+    def reload(self):
+        print("Reloading: warming the master and replacing every worker")
+        old = list(self.workers)
+        from .cache import content_cache
+
+        content_cache.clear()
+        self.app = preload()
+        gc.freeze()
+        for _ in range(self.target):
+            self.spawn()
+        for pid in old:
+            self.retire(pid)
+
+    def kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now > deadline:
+                print(f"Worker {pid} did not stop in time; killing it")
+                os.kill(pid, signal.SIGKILL)
+                self.retiring[pid] = now + 5
+
+    def stop(self):
+        for pid in list(self.workers):
+            self.retire(pid)
+        while self.retiring:
+            self.reap()
+            self.kill_overdue()
+            time.sleep(0.1)
+
+    def run(self):
+        for signum in MASTER_SIGNALS:
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+        print(f"Master {os.getpid()} serving {self.args.host}:{self.args.port} with {self.target} workers")
+        while True:
+            while self.signals:
+                signum = self.signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    print("Shutting down")
+                    self.stop()
+                    return
+                if signum == signal.SIGHUP:
+                    self.reload()
+                elif signum == signal.SIGTTIN:
+                    self.target += 1
+                elif signum == signal.SIGTTOU and self.target > 1:
+                    self.target -= 1
+            self.reap()
+            while len(self.workers) > self.target:
+                self.retire(max(self.workers, key=self.workers.get))
+            if len(self.workers) < self.target:
+                if self.respawn_delay:
+                    time.sleep(self.respawn_delay)
+                while len(self.workers) < self.target:
+                    self.spawn()
+            self.kill_overdue()
+            time.sleep(0.2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the app with pre-forked uvicorn workers.")
+    parser.add_argument("--host", default=os.getenv("SERVE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVE_PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+    )
+    parser.add_argument(
+        "--max-requests", type=int, default=int(os.getenv("SERVE_MAX_REQUESTS", "0")),
+        help="recycle a worker after this many requests (0 disables)",
+    )
+    parser.add_argument("--max-requests-jitter", type=int, default=int(os.getenv("SERVE_MAX_REQUESTS_JITTER", "0")))
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default=os.getenv("SERVE_LOG_LEVEL", "info"))
+    args = parser.parse_args(argv)
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    app = preload()
+    # Everything allocated so far is shared with the workers; keep the
+    # collector from writing to those pages in every child
+    gc.freeze()
+    Master(app, sock, args).run()
+
+
+if __name__ == "__main__":
+    main()
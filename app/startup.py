@@ -0,0 +1,163 @@
+# app/startup.py
+#
+# Worker startup, run from the application lifespan instead of at import time,
+# so importing app.main (tests, tooling, the benchmarks) opens no database
+# connection:
+#
+#   1. wait for the database, retrying with exponential backoff
+#      (STARTUP_DB_ATTEMPTS tries, first wait STARTUP_DB_BACKOFF seconds,
+#      doubling up to STARTUP_DB_BACKOFF_MAX)
+#   2. create missing tables; no DDL runs when the schema is already there
+#   3. the steps that need the schema (default admin)
+#   4. warm-ups (pool connections, templates, caches, background threads),
+#      concurrently unless STARTUP_PARALLEL=0
+#
+# Every step is timed; the timings are printed when the worker is ready and
+# exported on /metrics as app_startup_step_seconds.
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import QueuePool
+
+from . import models  # noqa: F401  (registers the tables on Base.metadata)
+from .database import Base
+from .metrics import registry
+
+STARTUP_DB_ATTEMPTS = int(os.getenv("STARTUP_DB_ATTEMPTS", "8"))
+STARTUP_DB_BACKOFF = float(os.getenv("STARTUP_DB_BACKOFF", "0.5"))
+STARTUP_DB_BACKOFF_MAX = float(os.getenv("STARTUP_DB_BACKOFF_MAX", "10"))
+STARTUP_PARALLEL = os.getenv("STARTUP_PARALLEL", "1") == "1"
+# Pool connections opened before the first request (0 disables)
+DB_POOL_WARM = int(os.getenv("DB_POOL_WARM", "2"))
+
+registry.describe(
+    "app_startup_step_seconds", "gauge", "Time each worker startup step took.", ("step",)
+)
+
+Step = Tuple[str, Callable[[], object]]
+
+
+class StartupReport:
+    """Wall time of each startup step, in the order they finished."""
+
+    def __init__(self, label: str = "Worker"):
+        self.label = label
+        self.steps: List[Tuple[str, float, Optional[str]]] = []  # name, seconds, error
+        self.started = time.perf_counter()
+        self.total = 0.0
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.steps.append((name, seconds, error))
+            registry.set("app_startup_step_seconds", (name,), seconds)
+
+    def run(self, name: str, fn: Callable[[], object], required: bool = True):
+        """Run one step; optional steps only log their failure."""
+        try:
+            with self.step(name):
+                fn()
+        except Exception as e:
+            if required:
+                raise
+            print(f"Startup step {name} failed: {e}")
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        registry.set("app_startup_step_seconds", ("total",), self.total)
+        print(f"{self.label} {os.getpid()} ready in {self.total * 1000:.0f} ms")
+        for name, seconds, error in sorted(self.steps, key=lambda step: -step[1]):
+            print(f"  {name:<28} {seconds * 1000:8.1f} ms" + (f"  FAILED ({error})" if error else ""))
+
+
+# -------------------------
+# Database
+# -------------------------
+def wait_for_database(
+    engine,
+    attempts: int = STARTUP_DB_ATTEMPTS,
+    backoff: float = STARTUP_DB_BACKOFF,
+    backoff_max: float = STARTUP_DB_BACKOFF_MAX,
+) -> int:
+    """Block until the database answers SELECT 1; returns the attempts it took."""
+    delay = backoff
+    for attempt in range(1, attempts + 1):
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return attempt
+        except DBAPIError as e:
+            if attempt == attempts:
+                raise
+            print(f"Database not reachable (attempt {attempt}/{attempts}): {e.orig}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, backoff_max)
+    return attempts
+
+
+def missing_tables(engine) -> list:
+    existing = set(inspect(engine).get_table_names())
+    return [table for table in Base.metadata.sorted_tables if table.name not in existing]
+
+
+def ensure_schema(engine) -> List[str]:
+    """Create the tables (with their indexes) that do not exist yet; returns their names."""
+    missing = missing_tables(engine)
+    if not missing:
+        return []
+    try:
+        Base.metadata.create_all(bind=engine, tables=missing)
+    except DBAPIError:
+        # Another worker may have created them first
+        if missing_tables(engine):
+            raise
+    names = [table.name for table in missing]
+    print(f"Created tables: {', '.join(names)}")
+    return names
+
+
+def warm_pool(engine, connections: int = DB_POOL_WARM):
+    """Open `connections` pool connections now so the first requests do not pay for them."""
+    if connections <= 0 or not isinstance(engine.pool, QueuePool):
+        return
+    opened = [engine.connect() for _ in range(min(connections, engine.pool.size()))]
+    for conn in opened:
+        conn.close()
+
+
+# -------------------------
+# Running
+# -------------------------
+def run_startup(
+    setup: Sequence[Step], warmups: Sequence[Step], parallel: bool = STARTUP_PARALLEL, label: str = "Worker",
+) -> StartupReport:
+    """
+    Run the `setup` steps in order (a failure aborts startup), then the
+    `warmups`, whose failures are only logged.
+    """
+    report = StartupReport(label)
+    for name, fn in setup:
+        report.run(name, fn)
+    if parallel and len(warmups) > 1:
+        with ThreadPoolExecutor(max_workers=len(warmups), thread_name_prefix="startup") as pool:
+            for future in [pool.submit(report.run, name, fn, False) for name, fn in warmups]:
+                future.result()
+    else:
+        for name, fn in warmups:
+            report.run(name, fn, required=False)
+    report.finish()
+    return report
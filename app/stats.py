@@ -0,0 +1,66 @@
+# app/stats.py
+#
+# Row counts for the admin dashboard and the public quizzes page, computed
+# with a single aggregate query and kept in a short-TTL cache.
+
+import os
+from typing import Dict, NamedTuple
+
+from sqlalchemy import func, literal, null, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache, content_version
+from .models import User, Lesson, Quiz
+
+
+class ContentStats(NamedTuple):
+    user_count: int
+    lesson_count: int
+    quiz_count: int
+    quiz_level_counts: Dict[str, int]
+
+    def quizzes_at(self, level: str) -> int:
+        return self.quiz_level_counts.get(level, 0)
+
+
+# Lesson/quiz writes bump the content version (part of the key, shared by the
+# workers); user writes call invalidate_stats(), and for the other workers the
+# TTL bounds how stale the user count gets.
+_stats_cache = TTLCache(maxsize=4, ttl=float(os.getenv("STATS_CACHE_TTL", "30")))
+
+_stats_query = union_all(
+    select(literal("quiz"), Quiz.level, func.count()).group_by(Quiz.level),
+    select(literal("lesson"), null(), func.count()).select_from(Lesson),
+    select(literal("user"), null(), func.count()).select_from(User),
+)
+
+
+def _stats_from_rows(rows) -> ContentStats:
+    counts = {"user": 0, "lesson": 0}
+    levels = {}
+    for kind, level, count in rows:
+        if kind == "quiz":
+            levels[level] = count
+        else:
+            counts[kind] = count
+    return ContentStats(counts["user"], counts["lesson"], sum(levels.values()), levels)
+
+def load_stats(db: Session) -> ContentStats:
+    """Count users, lessons and quizzes per level in one round-trip."""
+    return _stats_from_rows(db.execute(_stats_query))
+
+def get_stats(db: Session) -> ContentStats:
+    return _stats_cache.get_or_load(("stats", content_version()), lambda: load_stats(db))
+
+async def get_stats_async(db: AsyncSession) -> ContentStats:
+    """get_stats() for the async routes; shares the same cache."""
+    key = ("stats", content_version())
+    stats = _stats_cache.get(key)
+    if stats is None:
+        stats = _stats_from_rows(await db.execute(_stats_query))
+        _stats_cache.set(key, stats)
+    return stats
+
+def invalidate_stats():
+    _stats_cache.clear()
@@ -0,0 +1,271 @@
+# app/storage.py
+
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from fastapi import UploadFile
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import Headers
+
+# -------------------------
+# Paths and limits
+# -------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGES_DIR = os.path.join(BASE_DIR, "static", "images")
+IMAGES_URL = "/static/images"
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_REQUEST_UPLOAD_BYTES = int(os.getenv("MAX_REQUEST_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# Whole multipart body, enforced before it is spooled: the uploads plus
+# room for the other form fields and the multipart framing
+MAX_REQUEST_BODY_BYTES = int(os.getenv("MAX_REQUEST_BODY_BYTES", str(MAX_REQUEST_UPLOAD_BYTES + 1024 * 1024)))
+
+# Create images directory if it doesn't exist
+os.makedirs(IMAGES_DIR, exist_ok=True)
+
+# Uploads are stored as <sha256><ext>; older uploads used <uuid4><ext>.
+# Anything else in IMAGES_DIR is a site asset and never garbage collected.
+UPLOAD_NAME_RE = re.compile(
+    r"^(?:[0-9a-f]{64}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\.[A-Za-z0-9]+$"
+)
+TEMP_PREFIX = ".upload-"
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the per-file or per-request size limit."""
+
+
+class UploadBudget:
+    """Byte budget shared by all files saved for one request."""
+
+    def __init__(self, limit: int = MAX_REQUEST_UPLOAD_BYTES):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def consume(self, size: int):
+        with self._lock:
+            self.used += size
+            if self.used > self.limit:
+                raise UploadTooLarge(f"Uploads exceed {self.limit} bytes per request")
+
+
+def _has_file(file: Optional[UploadFile]) -> bool:
+    return bool(file and file.filename)
+
+def store_stream(source, original_name: Optional[str], budget: UploadBudget) -> Tuple[str, bool]:
+    """
+    Copy a readable binary stream into IMAGES_DIR in fixed-size chunks.
+
+    The file is named after the SHA-256 of its content, so identical images
+    are stored once. Data goes to a temp file in the same directory and is
+    renamed into place only once complete, so readers never see a partial
+    image. Returns (filename, created) where created is False for a duplicate.
+
+    The size limits checked here apply to a body Starlette has already
+    spooled; UploadSizeLimitMiddleware rejects oversized requests before that.
+    """
+    file_ext = (os.path.splitext(original_name)[1] if original_name else "") or ".jpg"
+    file_ext = file_ext.lower()
+    fd, tmp_path = tempfile.mkstemp(dir=IMAGES_DIR, prefix=TEMP_PREFIX, suffix=file_ext)
+    try:
+        digest = hashlib.sha256()
+        written = 0
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"{original_name} exceeds {MAX_UPLOAD_BYTES} bytes")
+                budget.consume(len(chunk))
+                digest.update(chunk)
+                buffer.write(chunk)
+        filename = f"{digest.hexdigest()}{file_ext}"
+        final_path = os.path.join(IMAGES_DIR, filename)
+        created = not os.path.exists(final_path)
+        if created:
+            os.replace(tmp_path, final_path)
+        else:
+            os.remove(tmp_path)
+            # Refresh the mtime so the GC grace period covers the reuse too
+            os.utime(final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return filename, created
+
+def _write_upload(file: UploadFile, budget: UploadBudget) -> Tuple[str, bool]:
+    """Store an UploadFile (runs off the event loop)."""
+    file.file.seek(0)
+    try:
+        return store_stream(file.file, file.filename, budget)
+    finally:
+        # Reset file pointer for potential reuse
+        file.file.seek(0)
+
+def _remove_saved(path: str):
+    try:
+        os.remove(os.path.join(IMAGES_DIR, os.path.basename(path)))
+    except FileNotFoundError:
+        pass
+
+
+# -------------------------
+# Public helpers
+# -------------------------
+async def _save(file: UploadFile, budget: UploadBudget) -> Tuple[str, bool]:
+    filename, created = await asyncio.to_thread(_write_upload, file, budget)
+    # Return relative path for database storage
+    return f"{IMAGES_URL}/{filename}", created
+
+async def save_uploaded_file(file: UploadFile, budget: Optional[UploadBudget] = None) -> str:
+    """Save uploaded file and return the relative path"""
+    path, _ = await _save(file, budget or UploadBudget())
+    return path
+
+async def save_uploaded_files(files: List[Optional[UploadFile]]) -> List[Optional[str]]:
+    """
+    Save several uploads concurrently under one per-request budget.
+
+    Returns one path per input, or None where no file was uploaded. If any
+    upload fails, files newly written for this request are removed again
+    (deduplicated files already in the store are left alone).
+    """
+    budget = UploadBudget()
+
+    async def save(file):
+        return await _save(file, budget) if _has_file(file) else (None, False)
+
+    results = await asyncio.gather(*(save(f) for f in files), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        for r in results:
+            if not isinstance(r, BaseException) and r[1]:
+                _remove_saved(r[0])
+        raise errors[0]
+    return [path for path, _ in results]
+
+
+# -------------------------
+# Request size limit
+# -------------------------
+class UploadSizeLimitMiddleware:
+    """
+    Reject multipart requests larger than `limit` bytes with 413 before the
+    form parser spools them: at once when Content-Length says so, otherwise
+    (chunked bodies) as soon as that many bytes have arrived. `path_limits`
+    gives some paths a limit of their own.
+    """
+
+    def __init__(self, app, limit: int = MAX_REQUEST_BODY_BYTES, path_limits=None):
+        self.app = app
+        self.limit = limit
+        self.path_limits = dict(path_limits or {})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+        limit = self.path_limits.get(scope["path"], self.limit)
+        length = headers.get("content-length", "")
+        if length.isdigit() and int(length) > limit:
+            await self._reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        state = {"started": False, "rejected": False}
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request" and not state["rejected"]:
+                received += len(message.get("body", b""))
+                if received > limit:
+                    state["rejected"] = True
+                    if not state["started"]:
+                        await self._reject(scope, receive, send, limit)
+                    # The parser sees a disconnect and stops reading
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if state["rejected"]:
+                return  # our 413 already went out
+            if message["type"] == "http.response.start":
+                state["started"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not state["rejected"]:
+                raise
+
+    async def _reject(self, scope, receive, send, limit: int):
+        response = PlainTextResponse(
+            f"Request body exceeds {limit} bytes", status_code=413, headers={"Connection": "close"},
+        )
+        await response(scope, receive, send)
+
+
+# -------------------------
+# Garbage collection
+# -------------------------
+def referenced_images(db) -> set:
+    """Filenames of every image referenced by a Lesson or Quiz row."""
+    from .models import Lesson, Quiz
+
+    columns = [
+        Lesson.image,
+        Quiz.question_image,
+        Quiz.option1_image,
+        Quiz.option2_image,
+        Quiz.option3_image,
+        Quiz.option4_image,
+    ]
+    names = set()
+    for column in columns:
+        for (path,) in db.query(column).filter(column.isnot(None)).distinct():
+            if path.startswith(IMAGES_URL + "/"):
+                names.add(path[len(IMAGES_URL) + 1:])
+    return names
+
+def collect_garbage(db, grace_seconds: float = 3600, dry_run: bool = False) -> List[str]:
+    """
+    Mark-and-sweep unreferenced uploads out of IMAGES_DIR.
+
+    Only files named like uploads are considered, and files younger than
+    `grace_seconds` are skipped so an upload whose row is not committed yet
+    survives. Stale temp files from interrupted uploads are swept as well.
+    Returns the removed (or, with dry_run, removable) filenames.
+    """
+    referenced = referenced_images(db)
+    cutoff = time.time() - grace_seconds
+    removed = []
+    with os.scandir(IMAGES_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            is_upload = UPLOAD_NAME_RE.match(entry.name) and entry.name not in referenced
+            is_stale_temp = entry.name.startswith(TEMP_PREFIX)
+            if not (is_upload or is_stale_temp) or entry.stat().st_mtime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(entry.path)
+            removed.append(entry.name)
+    return removed
@@ -0,0 +1,98 @@
+# app/templating.py
+#
+# Jinja2 environment setup: bytecode cache, startup precompilation and
+# per-template load/render timings.
+
+import os
+import threading
+import time
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache, FileSystemLoader, Template
+
+from .metrics import observe_template
+from .storage import BASE_DIR
+
+# In production templates are precompiled at startup, compiled bytecode is
+# persisted between restarts and the per-render mtime check is turned off.
+PRODUCTION = os.getenv("APP_ENV", "development").lower() == "production"
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", os.path.join(BASE_DIR, ".jinja_cache"))
+
+
+class TemplateTimings:
+    """Per-template load (compile or bytecode load) and render timings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, name):
+        return self._stats.setdefault(
+            name,
+            {"loads": 0, "load_ms": 0.0, "renders": 0, "render_total_ms": 0.0, "render_max_ms": 0.0},
+        )
+
+    def record_load(self, name: str, seconds: float):
+        with self._lock:
+            entry = self._entry(name)
+            entry["loads"] += 1
+            entry["load_ms"] = seconds * 1000
+
+    def record_render(self, name: str, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            entry = self._entry(name)
+            entry["renders"] += 1
+            entry["render_total_ms"] += ms
+            entry["render_max_ms"] = max(entry["render_max_ms"], ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._stats.items()}
+
+
+template_timings = TemplateTimings()
+
+
+class TimedLoader(FileSystemLoader):
+    """FileSystemLoader that records how long loading (and compiling) each template takes."""
+
+    def load(self, environment, name, globals=None):
+        start = time.perf_counter()
+        template = super().load(environment, name, globals)
+        template_timings.record_load(name, time.perf_counter() - start)
+        return template
+
+
+class TimedTemplate(Template):
+    def render(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            template_timings.record_render(self.name, elapsed)
+            observe_template(self.name, elapsed)
+
+
+def create_templates(directory: str) -> Jinja2Templates:
+    templates = Jinja2Templates(directory=directory)
+    env = templates.env
+    env.loader = TimedLoader(directory)
+    env.template_class = TimedTemplate
+    if PRODUCTION:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+        env.auto_reload = False
+    return templates
+
+def precompile_templates(templates: Jinja2Templates) -> dict:
+    """Load every template once so no request pays the compile cost. Returns name -> ms."""
+    env = templates.env
+    for name in env.list_templates(extensions=["html"]):
+        env.get_template(name)
+    timings = {name: entry["load_ms"] for name, entry in template_timings.snapshot().items()}
+    total = sum(timings.values())
+    slowest = max(timings, key=timings.get, default=None)
+    print(f"Precompiled {len(timings)} templates in {total:.1f} ms (slowest: {slowest})")
+    return timings
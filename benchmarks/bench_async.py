@@ -0,0 +1,243 @@
+# benchmarks/bench_async.py
+#
+# Compares the sync and async handlers of the ASYNC_ROUTES groups on the same
+# seeded SQLite database (pysqlite for the sync path, aiosqlite for the async
+# one) and fails when an async route renders a different page than its sync
+# counterpart.
+#
+# Each mode runs in its own process (ASYNC_ROUTES is read at import). Every
+# SQL statement sleeps --latency-ms inside the driver thread to stand in for a
+# network round-trip to Postgres, and the page/content/stats caches are off,
+# so each request waits on the database. A sync handler holds one of the
+# --threads threadpool threads for that wait; an async handler holds none, so
+# at concurrency above the thread limit the async path keeps scaling. The
+# default latency is high enough that 40 threads, not the CPU, are the sync
+# ceiling (40 / 0.2 s = 200 req/s for a one-statement page).
+#
+#   python benchmarks/bench_async.py
+#   python benchmarks/bench_async.py --concurrency 8,40,160 --latency-ms 100 --output async.json
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+
+# (client, path) for every route the async groups cover
+ROUTES = [
+    ("anon", "/lessons"),
+    ("anon", "/intermediatee"),
+    ("anon", "/advancee"),
+    ("anon", "/beginner"),
+    ("anon", "/intermediate"),
+    ("anon", "/advance"),
+    ("anon", "/quizzes"),
+    ("admin", "/add_lessons"),
+    ("admin", "/add_quizzes?size=20"),
+    ("admin", "/dashboard"),
+    ("admin", "/dashboard?q=user1"),
+    ("user", "/profile"),
+]
+
+
+# -------------------------
+# Child: one mode
+# -------------------------
+def add_latency(engine, async_engine, seconds: float):
+    """Sleep in the driver thread on every statement, for connections opened from now on."""
+    import time as _time
+    from sqlalchemy import event
+
+    def trace(statement):
+        _time.sleep(seconds)
+
+    @event.listens_for(engine, "connect")
+    def _sync_connect(dbapi_connection, record):
+        dbapi_connection.set_trace_callback(trace)
+
+    if async_engine is not None:
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def _async_connect(dbapi_connection, record):
+            # aiosqlite runs the callback on its connection thread, not the event loop
+            dbapi_connection.run_async(lambda connection: connection.set_trace_callback(trace))
+
+    # Seeding opened connections without the delay
+    engine.dispose()
+
+def endpoint_kind(app, path: str) -> str:
+    from fastapi.routing import APIRoute
+    path = path.split("?", 1)[0]
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return "async" if asyncio.iscoroutinefunction(route.endpoint) else "sync"
+    return "missing"
+
+async def run_child(args, fx, app) -> dict:
+    import anyio.to_thread
+    import httpx
+    from app.async_database import get_async_engine, ASYNC_ROUTES
+    from app.database import engine
+    from bench_http import ADMIN_PASSWORD, ADMIN_USERNAME, BENCH_PASSWORD, Scenario, login, run_scenario
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+    add_latency(engine, get_async_engine() if ASYNC_ROUTES else None, args.latency_ms / 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    clients = {
+        kind: httpx.AsyncClient(transport=transport, base_url="http://bench", follow_redirects=False)
+        for kind in ("anon", "user", "admin")
+    }
+    report = {"mode": args.child, "pages": {}, "handlers": {}, "results": []}
+    try:
+        await login(clients["user"], "user0", BENCH_PASSWORD)
+        await login(clients["admin"], ADMIN_USERNAME, ADMIN_PASSWORD)
+        for client, path in ROUTES:
+            response = await clients[client].get(path)
+            report["pages"][path] = [response.status_code, hashlib.sha256(response.content).hexdigest()]
+            report["handlers"][path] = endpoint_kind(app, path)
+            scenario = Scenario(f"GET {path}", client, lambda i, path=path: {"method": "GET", "url": path})
+            for concurrency in args.concurrency:
+                result = await run_scenario(clients[client], scenario, concurrency, args.requests, offset=0)
+                report["results"].append(result)
+                print(
+                    f"{args.child:<5} {result['route']:<28} c={concurrency:<4} {result['throughput_rps']:9.1f} req/s "
+                    f"p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f} ms",
+                    file=sys.stderr,
+                )
+    finally:
+        for client in clients.values():
+            await client.aclose()
+    return report
+
+def child_main(args):
+    sys.path.insert(0, BASE_DIR)
+    sys.path.insert(0, BENCH_DIR)
+
+    from app.main import app
+    from bench_http import Fixtures, _remove_new_files, _static_snapshot
+
+    before = _static_snapshot()
+    fx = Fixtures(argparse.Namespace(
+        users=args.users, lessons=args.lessons, quizzes=args.quizzes, seed=args.seed, requests=0, concurrency=[],
+    ))
+
+    async def session():
+        async with app.router.lifespan_context(app):
+            return await run_child(args, fx, app)
+
+    try:
+        # Seeded before startup, like the database a worker starts against
+        fx.seed()
+        report = asyncio.run(session())
+    finally:
+        _remove_new_files(before)
+    with open(args.report, "w") as f:
+        json.dump(report, f)
+
+
+# -------------------------
+# Parent: both modes
+# -------------------------
+def run_mode(mode: str, args) -> dict:
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, f"bench_async_{mode}.db")
+    report_path = os.path.join(directory, f"bench_async_{mode}.json")
+    pool = str(max(args.concurrency))
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        ASYNC_ROUTES="all" if mode == "async" else "",
+        # Connections are not the bottleneck in either mode
+        DB_POOL_SIZE=pool,
+        DB_MAX_OVERFLOW="0",
+        # Every request goes to the database
+        PAGE_CACHE_SIZE="0",
+        CONTENT_CACHE_SIZE="0",
+        STATS_CACHE_TTL="0",
+    )
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", mode, "--report", report_path,
+        "--users", str(args.users), "--lessons", str(args.lessons), "--quizzes", str(args.quizzes),
+        "--seed", str(args.seed), "--requests", str(args.requests), "--threads", str(args.threads),
+        "--latency-ms", str(args.latency_ms), "--concurrency", ",".join(map(str, args.concurrency)),
+    ]
+    try:
+        # The app's own prints go to stderr with the progress lines
+        subprocess.run(command, env=env, check=True, stdout=sys.stderr)
+        with open(report_path) as f:
+            return json.load(f)
+    finally:
+        for path in (report_path, db_path, db_path + "-wal", db_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+def compare_modes(sync: dict, async_: dict) -> int:
+    failures = 0
+    print("\nParity (async handler vs sync handler):", file=sys.stderr)
+    for path, page in sync["pages"].items():
+        other = async_["pages"].get(path)
+        handler = async_["handlers"].get(path)
+        problems = []
+        if handler != "async":
+            problems.append(f"served by a {handler} handler")
+        if other != page:
+            problems.append(f"page differs (HTTP {page[0]} vs {other[0] if other else '-'})")
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok':<5} GET {path:<28} {'; '.join(problems)}", file=sys.stderr)
+
+    print("\nThroughput, sync -> async:", file=sys.stderr)
+    async_results = {(r["route"], r["concurrency"]): r for r in async_["results"]}
+    for result in sync["results"]:
+        other = async_results.get((result["route"], result["concurrency"]))
+        if not other:
+            continue
+        print(
+            f"{result['route']:<32} c={result['concurrency']:<4} "
+            f"{result['throughput_rps']:8.1f} -> {other['throughput_rps']:8.1f} req/s   "
+            f"p95 {result['p95_ms']:8.2f} -> {other['p95_ms']:8.2f} ms",
+            file=sys.stderr,
+        )
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync versus async handlers for the ASYNC_ROUTES groups.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--lessons", type=int, default=20, help="lessons per level")
+    parser.add_argument("--quizzes", type=int, default=20, help="quizzes per level")
+    parser.add_argument("--seed", type=int, default=1509)
+    parser.add_argument("--concurrency", default="40,160", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=320, help="requests per route and concurrency level")
+    parser.add_argument("--threads", type=int, default=40, help="threadpool size (AnyIO's default is 40)")
+    parser.add_argument("--latency-ms", type=float, default=200, help="simulated database round-trip per statement")
+    parser.add_argument("--output", help="write both JSON reports here")
+    parser.add_argument("--child", choices=("sync", "async"), help=argparse.SUPPRESS)
+    parser.add_argument("--report", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    if args.child:
+        child_main(args)
+        return
+
+    started = time.time()
+    reports = {mode: run_mode(mode, args) for mode in ("sync", "async")}
+    failures = compare_modes(reports["sync"], reports["async"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k not in ("child", "report")}, **reports}, f, indent=2)
+    print(f"\nFinished in {time.time() - started:.0f}s", file=sys.stderr)
+    if failures:
+        print(f"{failures} async route(s) differ from their sync handlers", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
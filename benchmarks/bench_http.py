@@ -0,0 +1,443 @@
+# benchmarks/bench_http.py
+#
+# Drives every route of app.main.app through an in-process ASGI client
+# against a freshly seeded SQLite database and reports throughput and
+# p50/p95/p99 latency per route and concurrency level as JSON.
+#
+#   python benchmarks/bench_http.py --users 1000 --lessons 200 --quizzes 200 \
+#       --concurrency 1,8,32 --requests 200 --output bench.json
+#   python benchmarks/bench_http.py --baseline old.json --output new.json
+#
+# Fixtures are generated from --seed, so two runs with the same arguments
+# exercise identical data. Login goes through real Argon2 verification and
+# the add/update routes send real multipart image uploads.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from typing import Callable, List, NamedTuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LESSON_LEVELS = ("Basic", "Intermediate", "Advance")
+QUIZ_LEVELS = ("Beginner", "Intermediate", "Advance")
+BENCH_PASSWORD = "bench-password"
+ADMIN_USERNAME = "Rose"
+ADMIN_PASSWORD = "Rose@123"
+WORDS = (
+    "hello thank you please sorry family friend water food school home help "
+    "morning night love name learn sign hand letter number colour"
+).split()
+
+def _png(width=16, height=16):
+    """A small solid-colour PNG built with the stdlib, used for every upload."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    raw = b"".join(b"\x00" + b"\x80\x40\x20" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+PNG_BYTES = _png()
+
+
+class Scenario(NamedTuple):
+    name: str                      # "METHOD /path"
+    client: str                    # "anon", "user" or "admin"
+    build: Callable[[int], dict]   # request number -> httpx request kwargs
+
+
+# -------------------------
+# Fixtures
+# -------------------------
+class Fixtures:
+    """Seeds the database and remembers the ids the scenarios need."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        # Rows that the delete/update scenarios consume, one per request
+        self.pool = args.requests * len(args.concurrency)
+
+    def seed(self):
+        from sqlalchemy import insert, text
+        from app.authentication import hash_password
+        from app.database import SessionLocal, engine
+        from app.models import User, Lesson, Quiz
+        from app.startup import ensure_schema
+
+        ensure_schema(engine)
+        if engine.dialect.name == "sqlite":
+            with engine.connect() as conn:
+                conn.execute(text("PRAGMA journal_mode=WAL"))
+
+        # One real Argon2 hash shared by every seeded user
+        password = hash_password(BENCH_PASSWORD)
+        rng = self.rng
+        db = SessionLocal()
+        try:
+            users = self.args.users + self.pool
+            db.execute(
+                insert(User.__table__),
+                [
+                    {"email": f"user{i}@bench.test", "username": f"user{i}", "password": password}
+                    for i in range(users)
+                ],
+            )
+            lessons = []
+            for level in LESSON_LEVELS:
+                for i in range(self.args.lessons):
+                    lessons.append({
+                        "sign_level": level,
+                        "name": f"{level} sign {i}",
+                        "image": f"/static/images/{rng.getrandbits(256):064x}.png",
+                        "heading": f"How to sign {i}",
+                        "description": " ".join(rng.choice(WORDS) for _ in range(40)),
+                    })
+            lessons += [dict(lessons[i % len(lessons)]) for i in range(self.pool)] if lessons else []
+            if lessons:
+                db.execute(insert(Lesson.__table__), lessons)
+            quizzes = []
+            for level in QUIZ_LEVELS:
+                for i in range(self.args.quizzes):
+                    quizzes.append({
+                        "level": level,
+                        "question_text": f"Which sign means '{rng.choice(WORDS)}'?",
+                        "option1_image": f"/static/images/{rng.getrandbits(256):064x}.png",
+                        "option2_image": f"/static/images/{rng.getrandbits(256):064x}.png",
+                        "option3_image": f"/static/images/{rng.getrandbits(256):064x}.png",
+                        "option4_image": f"/static/images/{rng.getrandbits(256):064x}.png",
+                        "correct_option": rng.randint(1, 4),
+                    })
+            quizzes += [dict(quizzes[i % len(quizzes)]) for i in range(self.pool)] if quizzes else []
+            if quizzes:
+                db.execute(insert(Quiz.__table__), quizzes)
+            db.commit()
+
+            self.user_ids = [row[0] for row in db.execute(text("SELECT id FROM register ORDER BY id"))]
+            self.lesson_ids = [row[0] for row in db.execute(text("SELECT id FROM lessons ORDER BY id"))]
+            self.quiz_levels = {
+                level: [row[0] for row in db.execute(
+                    text("SELECT id FROM quizzes WHERE level = :level ORDER BY id LIMIT 200"), {"level": level}
+                )]
+                for level in QUIZ_LEVELS
+            }
+            self.quiz_ids = [row[0] for row in db.execute(text("SELECT id FROM quizzes ORDER BY id"))]
+        finally:
+            db.close()
+
+
+# -------------------------
+# Scenarios
+# -------------------------
+def _upload(name="sign.png"):
+    return (name, PNG_BYTES, "image/png")
+
+def _pick(ids, i):
+    return ids[i % len(ids)]
+
+def build_scenarios(fx: Fixtures) -> List[Scenario]:
+    # Delete/update targets come from the reserved pool at the end of each table
+    user_pool = fx.user_ids[-fx.pool:]
+    lesson_pool = fx.lesson_ids[-fx.pool:]
+    quiz_pool = fx.quiz_ids[-fx.pool:]
+    beginner = fx.quiz_levels["Beginner"]
+    csv_rows = "sign_level,name,image,heading,description\n" + "".join(
+        f"Basic,Imported {i},/static/images/imported.png,Heading {i},Description {i}\n" for i in range(20)
+    )
+
+    def get(path, client="anon"):
+        return Scenario(f"GET {path}", client, lambda i: {"method": "GET", "url": path})
+
+    def post(path, client, build):
+        return Scenario(f"POST {path}", client, lambda i: dict(method="POST", url=path, **build(i)))
+
+    return [
+        # Public pages
+        get("/"),
+        get("/home"),
+        get("/login"),
+        get("/register"),
+        get("/about"),
+        get("/contact"),
+        get("/lessons"),
+        get("/intermediatee"),
+        get("/advancee"),
+        get("/beginner"),
+        get("/intermediate"),
+        get("/advance"),
+        get("/quizzes"),
+        get("/profile", "user"),
+        # Free names (answered by the filter) and taken ones (database lookup)
+        get("/api/availability?username=free-name&email=free@bench.test"),
+        get("/api/availability?username=user1&email=user2@bench.test"),
+        # Lesson search: a common word, and a phrase still being typed (prefix)
+        get("/search?q=sign"),
+        get("/search?q=how+to+si"),
+        get("/logout"),
+        get("/metrics"),
+        # Admin pages
+        get("/dashboard", "admin"),
+        get("/dashboard?q=user1", "admin"),
+        get("/admin_profile", "admin"),
+        get("/profiling", "admin"),
+        get("/add_lessons", "admin"),
+        get("/add_quizzes", "admin"),
+        get("/export_lessons?format=csv", "admin"),
+        get("/export_quizzes?format=jsonl", "admin"),
+        # Authentication (real Argon2)
+        post("/login", "anon", lambda i: {"data": {
+            "username": f"user{i % fx.args.users}", "password": BENCH_PASSWORD,
+        }}),
+        post("/register", "anon", lambda i: {"data": {
+            "email": f"new{i}@bench.test", "username": f"new{i}",
+            "password": BENCH_PASSWORD, "confirm_password": BENCH_PASSWORD,
+        }}),
+        # Quiz submission
+        post("/submit_quiz", "user", lambda i: {"data": {
+            "quiz_id": [str(q) for q in beginner],
+            **{f"answer_{q}": str((q + i) % 4 + 1) for q in beginner},
+        }}),
+        # Profile updates (no password change)
+        post("/update_user_profile", "user", lambda i: {"data": {
+            "username": "user0", "email": "user0@bench.test",
+        }}),
+        post("/update_admin_profile", "admin", lambda i: {"data": {
+            "full_name": "Rose Khatiwada", "username": ADMIN_USERNAME, "email": "rkc123@gmail.com",
+        }}),
+        # Admin writes with multipart uploads
+        post("/add_lessons", "admin", lambda i: {
+            "data": {"sign_level": "Basic", "name": f"Bench {i}", "heading": "Bench", "description": "Bench"},
+            "files": {"image": _upload()},
+        }),
+        post("/update_lesson", "admin", lambda i: {
+            "data": {
+                "lesson_id": str(_pick(lesson_pool, i)), "sign_level": "Basic", "name": f"Updated {i}",
+                "heading": "Updated", "description": "Updated",
+            },
+            "files": {"image": _upload()},
+        }),
+        post("/add_quiz", "admin", lambda i: {
+            "data": {"level": "Beginner", "question_text": f"Bench {i}", "correct_option": "1"},
+            "files": {f"option{n}_image": _upload(f"option{n}.png") for n in range(1, 5)},
+        }),
+        post("/update_quiz", "admin", lambda i: {
+            "data": {
+                "quiz_id": str(_pick(quiz_pool, i)), "level": "Beginner",
+                "question_text": f"Updated {i}", "correct_option": "2",
+            },
+            "files": {"question_image": _upload()},
+        }),
+        post("/update_user", "admin", lambda i: {"data": {
+            "user_id": str(_pick(user_pool, i)),
+            "email": f"renamed{i}@bench.test", "username": f"renamed{i}",
+        }}),
+        post("/import_lessons", "admin", lambda i: {
+            "data": {"dry_run": "true"}, "files": {"file": ("lessons.csv", csv_rows.encode(), "text/csv")},
+        }),
+        # Deletes last, each request removes one pool row
+        post("/delete_lesson", "admin", lambda i: {"data": {"lesson_id": str(_pick(lesson_pool, i))}}),
+        post("/delete_quiz", "admin", lambda i: {"data": {"quiz_id": str(_pick(quiz_pool, i))}}),
+        post("/delete_user", "admin", lambda i: {"data": {"user_id": str(_pick(user_pool, i))}}),
+    ]
+
+
+# -------------------------
+# Runner
+# -------------------------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+async def run_scenario(client, scenario: Scenario, concurrency: int, requests: int, offset: int) -> dict:
+    latencies = []
+    statuses = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for n in counter:
+            kwargs = scenario.build(offset + n)
+            start = time.perf_counter()
+            response = await client.request(**kwargs)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "route": scenario.name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(requests / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+async def login(client, username, password):
+    response = await client.post("/login", data={"username": username, "password": password})
+    if response.status_code != 303:
+        raise RuntimeError(f"Benchmark login as {username!r} failed with {response.status_code}")
+
+async def run(args, fx: Fixtures, app) -> List[dict]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    clients = {
+        kind: httpx.AsyncClient(transport=transport, base_url="http://bench", follow_redirects=False)
+        for kind in ("anon", "user", "admin")
+    }
+    results = []
+    try:
+        await login(clients["user"], "user0", BENCH_PASSWORD)
+        await login(clients["admin"], ADMIN_USERNAME, ADMIN_PASSWORD)
+        scenarios = [s for s in build_scenarios(fx) if not args.routes or any(r in s.name for r in args.routes)]
+        for scenario in scenarios:
+            for level_index, concurrency in enumerate(args.concurrency):
+                # Warm-up, not measured
+                for n in range(min(args.warmup, args.requests)):
+                    await clients[scenario.client].request(**scenario.build(-1 - n))
+                result = await run_scenario(
+                    clients[scenario.client], scenario, concurrency, args.requests,
+                    offset=level_index * args.requests,
+                )
+                results.append(result)
+                print(
+                    f"{result['route']:<32} c={concurrency:<4} {result['throughput_rps']:9.1f} req/s "
+                    f"p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms"
+                    + (f"  errors {result['errors']}" if result["errors"] else ""),
+                    file=sys.stderr,
+                )
+    finally:
+        for client in clients.values():
+            await client.aclose()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline_path, results):
+    with open(baseline_path) as f:
+        baseline = {(r["route"], r["concurrency"]): r for r in json.load(f)["results"]}
+    print(f"\nChange versus {baseline_path} (p95 latency, throughput):", file=sys.stderr)
+    for result in results:
+        old = baseline.get((result["route"], result["concurrency"]))
+        if not old or not old["p95_ms"] or not old["throughput_rps"]:
+            continue
+        p95 = (result["p95_ms"] / old["p95_ms"] - 1) * 100
+        rps = (result["throughput_rps"] / old["throughput_rps"] - 1) * 100
+        print(f"{result['route']:<32} c={result['concurrency']:<4} p95 {p95:+7.1f}%  req/s {rps:+7.1f}%", file=sys.stderr)
+
+def _static_snapshot():
+    from app.storage import IMAGES_DIR
+    from app.images import DERIVED_DIR
+    return {d: set(os.listdir(d)) if os.path.isdir(d) else set() for d in (IMAGES_DIR, DERIVED_DIR)}
+
+def _remove_new_files(before):
+    for directory, names in before.items():
+        if not os.path.isdir(directory):
+            continue
+        for name in set(os.listdir(directory)) - names:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP benchmark of every route on a seeded SQLite database.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--lessons", type=int, default=100, help="lessons per level")
+    parser.add_argument("--quizzes", type=int, default=100, help="quizzes per level")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per route and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each run")
+    parser.add_argument("--seed", type=int, default=1509)
+    parser.add_argument("--routes", nargs="*", help="only run routes containing one of these substrings")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--keep-db", action="store_true", help="keep the SQLite file after the run")
+    args = parser.parse_args(argv)
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    args.users = max(args.users, 1)
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench_http.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, BASE_DIR)
+
+    from app.main import app
+
+    before = _static_snapshot()
+    fx = Fixtures(args)
+
+    async def session():
+        # Run the app's own startup/shutdown hooks around the whole benchmark
+        async with app.router.lifespan_context(app):
+            return await run(args, fx, app)
+
+    try:
+        # Seeded before startup, like the database a worker starts against
+        fx.seed()
+        results = asyncio.run(session())
+    finally:
+        _remove_new_files(before)
+        if not args.keep_db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "fixtures": {
+                "users": args.users,
+                "lessons_per_level": args.lessons,
+                "quizzes_per_level": args.quizzes,
+                "seed": args.seed,
+            },
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.baseline:
+        compare(args.baseline, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_projection.py
+#
+# Per-row time and allocation of full ORM entities versus the read-only
+# projections in app/queries.py, on a seeded SQLite database.
+#
+#   python benchmarks/bench_projection.py --rows 20000 --repeat 20
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(label, fn, session_factory, repeat, rows):
+    # Warm-up run (statement compilation caches)
+    db = session_factory()
+    fn(db)
+    db.close()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        db = session_factory()
+        result = fn(db)
+        db.close()
+    elapsed = (time.perf_counter() - start) / repeat
+    assert len(result) == rows
+
+    db = session_factory()
+    tracemalloc.start()
+    result = fn(db)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.close()
+
+    print(
+        f"{label:<40} {elapsed * 1000:9.2f} ms/query "
+        f"{elapsed / rows * 1e6:8.2f} us/row {peak / rows:9.0f} B/row peak"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare ORM entities with read-only projections.")
+    parser.add_argument("--rows", type=int, default=20000, help="quizzes at the measured level")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench_projection.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, BASE_DIR)
+
+    from sqlalchemy import insert
+    from app.database import SessionLocal, engine
+    from app.models import Quiz
+    from app.queries import quiz_cards
+    from app.startup import ensure_schema
+
+    ensure_schema(engine)
+    db = SessionLocal()
+    db.execute(
+        insert(Quiz.__table__),
+        [
+            {
+                "level": "Beginner",
+                "question_text": f"Which sign is letter {i % 26}?",
+                "option1_image": f"/static/images/{i:064x}.png",
+                "option2_image": f"/static/images/{i + 1:064x}.png",
+                "option3_image": f"/static/images/{i + 2:064x}.png",
+                "option4_image": f"/static/images/{i + 3:064x}.png",
+                "correct_option": i % 4 + 1,
+            }
+            for i in range(args.rows)
+        ],
+    )
+    db.commit()
+    db.close()
+
+    print(f"{args.rows} rows, {args.repeat} repeats")
+    measure(
+        "db.query(Quiz).filter(...).all()",
+        lambda db: db.query(Quiz).filter(Quiz.level == "Beginner").all(),
+        SessionLocal,
+        args.repeat,
+        args.rows,
+    )
+    measure("quiz_cards(db, level)", lambda db: quiz_cards(db, "Beginner"), SessionLocal, args.repeat, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# benchmarks/bench_search.py
+#
+# Build time, snapshot size/load time and query latency of the lesson search
+# index (app/search.py) on synthetic lessons whose words follow a Zipf
+# distribution over a generated vocabulary, so there are very common words,
+# rare ones and many shared prefixes. Every measured query is also checked
+# against a brute-force scan of all lessons.
+#
+#   python benchmarks/bench_search.py --lessons 100000
+#   python benchmarks/bench_search.py --lessons 20000 --queries 500 --limit 10
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SYLLABLES = "ba be bi bo da de di do fa fe ka ki ko la le li lo ma me mi mo na ne ni no ra re ri ro sa se si so ta te ti to".split()
+LEVELS = ("Basic", "Intermediate", "Advance")
+
+
+def vocabulary(size: int, rng: random.Random):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)  # rank (frequency) independent of spelling
+    return words
+
+
+def documents(count: int, words, rng: random.Random):
+    from app.search import SearchDocument
+
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+
+    def text(n):
+        return " ".join(rng.choices(words, weights, k=n))
+
+    for lesson_id in range(1, count + 1):
+        yield SearchDocument(
+            lesson_id, LEVELS[lesson_id % 3], text(2), f"/static/images/{lesson_id}.png", text(6), text(40),
+        )
+
+
+def queries(count: int, words, rng: random.Random):
+    """Mix of single words, two-word phrases and prefixes still being typed, by frequency."""
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    result = []
+    for i in range(count):
+        first, second = rng.choices(words, weights, k=2)
+        kind = i % 4
+        if kind == 0:
+            result.append(first)
+        elif kind == 1:
+            result.append(f"{first} {second}")
+        elif kind == 2:
+            result.append(first[:3])
+        else:
+            result.append(f"{first} {second[:2]}")
+    return result
+
+
+def brute_force(index, query: str, limit: int):
+    """Scores of the best `limit` lessons, by scoring every lesson."""
+    from app.search import tokenize
+
+    tokens = tokenize(query)
+    total = len(index.docs)
+    terms = []
+    for token in dict.fromkeys(tokens):
+        if token == tokens[-1]:
+            choices = index._expansions(token)
+        else:
+            choices = [(token, 1.0)] if token in index.postings else []
+        if not choices:
+            return []
+        terms.append({
+            word: weight * math.log(1 + total / len(index.postings[word].impacts)) for word, weight in choices
+        })
+    scores = []
+    for doc in index.docs.values():
+        impacts = index._terms(doc)
+        score = 0.0
+        for choices in terms:
+            best = max((impacts[word] * weight for word, weight in choices.items() if word in impacts), default=0.0)
+            if not best:
+                break
+            score += best
+        else:
+            scores.append(score)
+    return sorted(scores, reverse=True)[:limit]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the in-process lesson search index.")
+    parser.add_argument("--lessons", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=50, help="results per query (SEARCH_MAX_RESULTS)")
+    parser.add_argument("--check", type=int, default=50, help="queries verified by brute force")
+    parser.add_argument("--seed", type=int, default=1509)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench_search.db')}"
+    sys.path.insert(0, BASE_DIR)
+    from app.cache import TTLCache
+    from app.search import SEARCH_CACHE_SIZE, LessonIndex
+
+    rng = random.Random(args.seed)
+    words = vocabulary(args.vocabulary, rng)
+    docs = list(documents(args.lessons, words, rng))
+
+    index = LessonIndex()
+    start = time.perf_counter()
+    index.replace(docs)
+    build = time.perf_counter() - start
+    print(f"build       {args.lessons} lessons, {len(index.postings)} words in {build:.2f} s")
+
+    snapshot = os.path.join(directory, "search_index.pickle")
+    start = time.perf_counter()
+    index.save(snapshot)
+    save = time.perf_counter() - start
+    loaded = LessonIndex(cache_size=0)
+    start = time.perf_counter()
+    assert loaded.load(snapshot)
+    load = time.perf_counter() - start
+    print(
+        f"snapshot    {os.path.getsize(snapshot) / 1e6:.1f} MB, "
+        f"saved in {save:.2f} s, loaded in {load:.2f} s ({load / build:.0%} of a rebuild)"
+    )
+
+    mix = queries(args.queries, words, rng)
+    for query in mix[:50]:  # warm-up: sorts each word's postings once
+        loaded.search(query, args.limit)
+    # Every query computed, then the same queries repeated from the result cache
+    for label, cache_size in (("uncached", 0), ("repeated (cached)", SEARCH_CACHE_SIZE)):
+        loaded.results = TTLCache(maxsize=cache_size, ttl=3600)
+        for query in mix if cache_size else ():
+            loaded.search(query, args.limit)
+        latencies = {}
+        for i, query in enumerate(mix):
+            start = time.perf_counter()
+            loaded.search(query, args.limit)
+            latencies.setdefault(("word", "phrase", "prefix", "phrase + prefix")[i % 4], []).append(
+                time.perf_counter() - start
+            )
+        print(f"\n{label} queries")
+        for kind, values in [*latencies.items(), ("all", sum(latencies.values(), []))]:
+            print(
+                f"  {kind:<16} p50 {percentile(values, 50) * 1000:7.3f} ms  "
+                f"p99 {percentile(values, 99) * 1000:7.3f} ms  max {max(values) * 1000:7.3f} ms"
+            )
+    loaded.results = TTLCache(maxsize=0, ttl=3600)
+    print()
+
+    mismatches = 0
+    for query in mix[:args.check]:
+        expected = brute_force(loaded, query, args.limit)
+        got = [hit.score for hit in loaded.search(query, args.limit)]
+        if len(got) != len(expected) or not all(math.isclose(a, b, rel_tol=1e-9) for a, b in zip(got, expected)):
+            mismatches += 1
+            print(f"MISMATCH  {query!r}: {got[:3]} vs {expected[:3]}")
+
+    start = time.perf_counter()
+    for doc in docs[:1000]:
+        loaded.upsert(doc._replace(name=f"{doc.name} updated"))
+    upsert = (time.perf_counter() - start) / 1000
+    print(f"upsert      {upsert * 1e6:.1f} us per lesson")
+    print(f"\n{args.check - mismatches}/{args.check} queries match a brute-force scan")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
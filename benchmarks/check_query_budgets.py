@@ -0,0 +1,108 @@
+# benchmarks/check_query_budgets.py
+#
+# Sends one request to every route of app.main.app (the scenarios from
+# bench_http.py) on a seeded SQLite database with QUERY_BUDGETS=1, and fails
+# when a route has no @query_budget, exceeds it, or repeats a statement.
+#
+#   python benchmarks/check_query_budgets.py
+#   python benchmarks/check_query_budgets.py --lessons 50 --quizzes 50 -v
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+
+
+async def check(app, fx, verbose: bool) -> int:
+    import httpx
+    from fastapi.routing import APIRoute
+    from app.query_budget import budget_of, budget_report
+    from bench_http import ADMIN_PASSWORD, ADMIN_USERNAME, BENCH_PASSWORD, build_scenarios, login
+
+    failures = 0
+    undeclared = [
+        f"{','.join(sorted(route.methods))} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute) and budget_of(route.endpoint) is None
+    ]
+    for route in undeclared:
+        print(f"FAIL  {route:<36} no @query_budget declared")
+        failures += 1
+
+    transport = httpx.ASGITransport(app=app)
+    clients = {
+        kind: httpx.AsyncClient(transport=transport, base_url="http://check", follow_redirects=False)
+        for kind in ("anon", "user", "admin")
+    }
+    try:
+        await login(clients["user"], "user0", BENCH_PASSWORD)
+        await login(clients["admin"], ADMIN_USERNAME, ADMIN_PASSWORD)
+        budget_report.clear()
+        for scenario in build_scenarios(fx):
+            budget_report.last = None
+            response = await clients[scenario.client].request(**scenario.build(0))
+            if budget_report.last is None:
+                continue
+            label, recorder = budget_report.last
+            problems = budget_report.violations.pop(label, [])
+            status = "FAIL" if problems else "ok"
+            failures += bool(problems)
+            print(f"{status:<5} {scenario.name:<36} {recorder.count:>3} queries  HTTP {response.status_code}")
+            for problem in problems:
+                print(f"        {problem}")
+            if verbose:
+                for statement in recorder.statements:
+                    print("        | " + " ".join(statement.split())[:150])
+    finally:
+        for client in clients.values():
+            await client.aclose()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every route against its declared query budget.")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--lessons", type=int, default=10, help="lessons per level")
+    parser.add_argument("--quizzes", type=int, default=10, help="quizzes per level")
+    parser.add_argument("--seed", type=int, default=1509)
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every statement")
+    args = parser.parse_args(argv)
+    # Fixtures reserve one row per request for the update/delete routes
+    args.requests, args.concurrency = 1, [1]
+
+    db_path = os.path.join(tempfile.mkdtemp(), "check_query_budgets.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["QUERY_BUDGETS"] = "1"
+    sys.path.insert(0, BASE_DIR)
+    sys.path.insert(0, BENCH_DIR)
+
+    from app.main import app
+    from bench_http import Fixtures, _remove_new_files, _static_snapshot
+
+    before = _static_snapshot()
+    fx = Fixtures(args)
+
+    async def session():
+        async with app.router.lifespan_context(app):
+            return await check(app, fx, args.verbose)
+
+    try:
+        # Seeded before startup, like the database a worker starts against
+        fx.seed()
+        failures = asyncio.run(session())
+    finally:
+        _remove_new_files(before)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    print(f"\n{failures} route(s) over budget" if failures else "\nAll routes within their query budgets")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# benchmarks/check_replicas.py
+#
+# Checks read-replica routing locally with two SQLite files: the primary, a
+# copy of it as the replica, and a second replica URL that cannot be opened.
+# A lesson written only to the replica file shows which database served a
+# page:
+#
+#   - GET requests read from the healthy replica; the broken one is skipped
+#   - a write goes to the primary, and the same browser reads the primary
+#     until REPLICA_STICKY_SECONDS have passed
+#   - cached public pages are loaded from the primary, so a lagging replica
+#     does not fill the caches under the version a write just bumped
+#   - with every replica down, GET requests fall back to the primary
+#
+#   python benchmarks/check_replicas.py
+#   python benchmarks/check_replicas.py --async    # with ASYNC_ROUTES=all
+
+import argparse
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+
+STICKY_SECONDS = 1.0
+REPLICA_MARKER = "Replica only lesson"
+PRIMARY_MARKER = "Primary write lesson"
+
+
+def copy_database(source: str, target: str):
+    """Consistent copy of a (WAL mode) SQLite file, standing in for replication."""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+    with sqlite3.connect(target) as conn:
+        conn.execute(
+            "INSERT INTO lessons (sign_level, name, image, heading, description) VALUES (?, ?, ?, ?, ?)",
+            ("Basic", REPLICA_MARKER, "/static/images/replica.png", "Replica", "Replica"),
+        )
+
+
+async def check(app) -> int:
+    import httpx
+    from app.replicas import replicas
+    from bench_http import ADMIN_PASSWORD, ADMIN_USERNAME, PNG_BYTES, login
+
+    failures = 0
+
+    def expect(name, condition, detail=""):
+        nonlocal failures
+        failures += not condition
+        print(f"{'ok' if condition else 'FAIL':<5} {name}" + (f"  ({detail})" if detail and not condition else ""))
+
+    async def served_by(client) -> str:
+        body = (await client.get("/add_lessons?size=500")).text
+        if REPLICA_MARKER in body:
+            return "replica"
+        return "primary"
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as admin, \
+            httpx.AsyncClient(transport=transport, base_url="http://check") as other:
+        healthy = [replica.healthy for replica in replicas.replicas]
+        expect("broken replica marked down at startup", healthy == [True, False], str(healthy))
+
+        await login(admin, ADMIN_USERNAME, ADMIN_PASSWORD)
+        expect("GET right after login reads the primary", await served_by(admin) == "primary")
+        await asyncio.sleep(STICKY_SECONDS + 0.1)
+        sources = {await served_by(admin) for _ in range(6)}
+        expect("GET reads the healthy replica", sources == {"replica"}, str(sources))
+
+        response = await admin.post(
+            "/add_lessons",
+            data={"sign_level": "Basic", "name": PRIMARY_MARKER, "heading": "Primary", "description": "Primary"},
+            files={"image": ("sign.png", PNG_BYTES, "image/png")},
+        )
+        expect("POST /add_lessons succeeds", response.status_code == 303, f"HTTP {response.status_code}")
+        body = (await admin.get("/add_lessons?size=500")).text
+        expect(
+            "writer reads its own write from the primary",
+            PRIMARY_MARKER in body and REPLICA_MARKER not in body,
+        )
+        expect("another browser still reads the replica", await served_by(other) == "replica")
+        page = (await other.get("/lessons")).text
+        expect(
+            "cached lesson page is loaded from the primary",
+            PRIMARY_MARKER in page and REPLICA_MARKER not in page,
+        )
+        await asyncio.sleep(STICKY_SECONDS + 0.1)
+        expect("writer returns to the replica after the window", await served_by(admin) == "replica")
+
+        for replica in replicas.replicas:
+            replica.mark(False)
+        response = await other.get("/add_lessons?size=500")
+        expect(
+            "all replicas down: GET falls back to the primary",
+            response.status_code == 200 and PRIMARY_MARKER in response.text,
+            f"HTTP {response.status_code}",
+        )
+        metrics = (await other.get("/metrics")).text
+        expect("/metrics reports no healthy replica", "db_replicas_healthy 0" in metrics)
+
+        replicas.check()
+        expect("health check brings the replica back", await served_by(other) == "replica")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check read-replica routing on two SQLite files.")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="serve the reads with ASYNC_ROUTES=all")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    primary = os.path.join(directory, "primary.db")
+    replica = os.path.join(directory, "replica.db")
+    missing = os.path.join(directory, "missing", "replica.db")
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{primary}",
+        DATABASE_REPLICA_URLS=f"sqlite:///{replica},sqlite:///{missing}",
+        REPLICA_STICKY_SECONDS=str(STICKY_SECONDS),
+        ASYNC_ROUTES="all" if args.use_async else "",
+    )
+    sys.path.insert(0, BASE_DIR)
+    sys.path.insert(0, BENCH_DIR)
+
+    from app.main import app
+    from bench_http import Fixtures, _remove_new_files, _static_snapshot
+
+    before = _static_snapshot()
+    fx = Fixtures(argparse.Namespace(users=5, lessons=3, quizzes=3, seed=1509, requests=0, concurrency=[]))
+    fx.seed()
+    copy_database(primary, replica)
+
+    async def session():
+        async with app.router.lifespan_context(app):
+            return await check(app)
+
+    try:
+        failures = asyncio.run(session())
+    finally:
+        _remove_new_files(before)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"\n{failures} check(s) failed" if failures else "\nReplica routing behaves as expected")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+-- SQL script to create the quiz_attempts table in PostgreSQL
+-- Run this script in pgAdmin4 or your PostgreSQL client
+-- Database: GestureLab
+
+-- One row per answered (or skipped) question of a submitted quiz
+CREATE TABLE IF NOT EXISTS quiz_attempts (
+    id SERIAL PRIMARY KEY,
+    attempt_id VARCHAR(36) NOT NULL,
+    user_id INTEGER,
+    quiz_id INTEGER NOT NULL,
+    level VARCHAR(50) NOT NULL,
+    selected_option INTEGER,
+    is_correct BOOLEAN NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Indexes for per-attempt, per-user and per-question reporting
+CREATE INDEX IF NOT EXISTS ix_quiz_attempts_attempt_id ON quiz_attempts(attempt_id);
+CREATE INDEX IF NOT EXISTS ix_quiz_attempts_user_id ON quiz_attempts(user_id);
+CREATE INDEX IF NOT EXISTS ix_quiz_attempts_quiz_id ON quiz_attempts(quiz_id);
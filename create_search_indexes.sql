@@ -0,0 +1,10 @@
+-- SQL script to add the admin dashboard search indexes in PostgreSQL
+-- Run this script in pgAdmin4 or your PostgreSQL client
+-- Database: GestureLab
+
+-- New databases get these from the application on startup; existing
+-- databases need them added once.
+
+-- Case-insensitive prefix search on username/email (lower(col) LIKE 'abc%')
+CREATE INDEX IF NOT EXISTS ix_register_username_lower ON register (lower(username) varchar_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_register_email_lower ON register (lower(email) varchar_pattern_ops);
@@ -0,0 +1,106 @@
+# tests/conftest.py
+#
+# The app reads its configuration at import, so the environment is set here,
+# before any test module imports app.main: a throwaway SQLite database (served
+# through aiosqlite on the async path), every ASYNC_ROUTES group switched on,
+# and the page/content/stats caches off so each request reaches the database.
+#
+#   pip install pytest && python -m pytest tests
+
+import os
+import sys
+import tempfile
+from typing import Optional
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix="sign-language-tests-")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(TEST_DIR, 'app.db')}",
+    ASYNC_ROUTES="all",
+    PAGE_CACHE_SIZE="0",
+    CONTENT_CACHE_SIZE="0",
+    STATS_CACHE_TTL="0",
+    # Keep the worker's side files out of the checkout
+    ADMIN_VERSION_FILE=os.path.join(TEST_DIR, ".admin_version"),
+    CONTENT_VERSION_FILE=os.path.join(TEST_DIR, ".content_version"),
+    LESSON_VERSION_FILE=os.path.join(TEST_DIR, ".lesson_version"),
+    IMAGE_VERSION_FILE=os.path.join(TEST_DIR, ".image_version"),
+    SEARCH_SNAPSHOT=os.path.join(TEST_DIR, ".search_index.pickle"),
+    # Cheap hashes; the seeded passwords still go through Argon2
+    ARGON2_TIME_COST="1",
+    ARGON2_MEMORY_COST="8192",
+    ARGON2_PARALLELISM="1",
+)
+sys.path.insert(0, BASE_DIR)
+
+ADMIN_USERNAME = "Rose"
+ADMIN_PASSWORD = "Rose@123"
+USER_PASSWORD = "learner-pass"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    One client for the whole run. Entering it runs the lifespan (schema,
+    default admin, warm-ups) and keeps a single event loop, the one the
+    async engine's aiosqlite connections belong to.
+    """
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        seed()
+        yield client
+
+
+def seed():
+    from app.authentication import hash_password
+    from app.database import SessionLocal
+    from app.models import Lesson, Quiz, User
+
+    db = SessionLocal()
+    try:
+        db.add(User(username="learner", email="learner@example.com", password=hash_password(USER_PASSWORD)))
+        for level, count in (("Basic", 3), ("Intermediate", 2), ("Advance", 1)):
+            for i in range(count):
+                db.add(Lesson(
+                    sign_level=level, name=f"{level} sign {i}", image=f"/static/images/{level}-{i}.png",
+                    heading=f"{level} heading {i}", description="Raise the hand.",
+                ))
+        for level, count in (("Beginner", 4), ("Intermediate", 2), ("Advance", 1)):
+            for i in range(count):
+                db.add(Quiz(
+                    level=level, question_text=f"{level} question {i}",
+                    option1_text="A", option2_text="B", option3_text="C", option4_text="D", correct_option=1,
+                ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def signed_in(client, username: Optional[str] = None, password: Optional[str] = None):
+    """The shared client with a fresh session, logged in as `username` when given."""
+    client.cookies.clear()
+    if username is not None:
+        response = client.post("/login", data={"username": username, "password": password}, follow_redirects=False)
+        assert response.status_code == 303, response.text
+    return client
+
+
+@pytest.fixture
+def anon(client):
+    return signed_in(client)
+
+
+@pytest.fixture
+def admin(client):
+    return signed_in(client, ADMIN_USERNAME, ADMIN_PASSWORD)
+
+
+@pytest.fixture
+def learner(client):
+    return signed_in(client, "learner", USER_PASSWORD)
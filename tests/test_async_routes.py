@@ -0,0 +1,123 @@
+# tests/test_async_routes.py
+#
+# The async database path (app/async_database.py) against SQLite through
+# aiosqlite: get_async_db itself, and every ASYNC_ROUTES handler rendering
+# the seeded rows.
+
+import asyncio
+import re
+
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from app.async_database import ASYNC_ROUTES, ASYNC_ROUTE_GROUPS, get_async_db, get_async_engine
+from app.models import Lesson
+
+ASYNC_PATHS = [
+    "/lessons", "/intermediatee", "/advancee", "/beginner", "/intermediate", "/advance",
+    "/quizzes", "/add_lessons", "/add_quizzes", "/dashboard", "/profile",
+]
+
+
+def endpoint_for(app, path: str):
+    """The GET handler that serves `path` (the first matching route wins)."""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route.endpoint
+    raise LookupError(path)
+
+
+def test_every_group_enabled_on_aiosqlite(client):
+    assert ASYNC_ROUTES == frozenset(ASYNC_ROUTE_GROUPS)
+    assert get_async_engine().dialect.driver == "aiosqlite"
+
+
+@pytest.mark.parametrize("path", ASYNC_PATHS)
+def test_path_served_by_async_handler(client, path):
+    assert asyncio.iscoroutinefunction(endpoint_for(client.app, path))
+
+
+def test_get_async_db_yields_a_working_session(client):
+    async def count_lessons():
+        request = Request({"type": "http", "method": "GET", "path": "/", "headers": [], "session": {}})
+        dependency = get_async_db(request)
+        db = await dependency.__anext__()
+        try:
+            assert isinstance(db, AsyncSession)
+            return await db.scalar(select(func.count()).select_from(Lesson))
+        finally:
+            await dependency.aclose()
+
+    # On the client's event loop, which owns the engine's aiosqlite connections
+    assert client.portal.call(count_lessons) == 6
+
+
+@pytest.mark.parametrize(
+    "path, present, absent",
+    [
+        ("/lessons", ["Basic sign 0", "Basic sign 2"], ["Intermediate sign 0"]),
+        ("/intermediatee", ["Intermediate sign 0", "Intermediate sign 1"], ["Basic sign 0"]),
+        ("/advancee", ["Advance sign 0"], ["Basic sign 0"]),
+        ("/beginner", ["Beginner question 0", "Beginner question 3"], ["Advance question 0"]),
+        ("/intermediate", ["Intermediate question 1"], ["Beginner question 0"]),
+        ("/advance", ["Advance question 0"], ["Beginner question 0"]),
+    ],
+)
+def test_level_pages(anon, path, present, absent):
+    response = anon.get(path)
+    assert response.status_code == 200
+    assert response.headers["etag"]
+    for text in present:
+        assert text in response.text
+    for text in absent:
+        assert text not in response.text
+
+
+def test_level_page_not_modified(anon):
+    etag = anon.get("/lessons").headers["etag"]
+    response = anon.get("/lessons", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_public_quiz_counts(anon):
+    response = anon.get("/quizzes")
+    assert response.status_code == 200
+    assert "Beginner (4 quizzes)" in response.text
+    assert "Intermediate (2 quizzes)" in response.text
+
+
+def test_admin_listings(admin):
+    lessons = admin.get("/add_lessons")
+    assert lessons.status_code == 200
+    for name in ("Basic sign 0", "Intermediate sign 1", "Advance sign 0"):
+        assert name in lessons.text
+
+    quizzes = admin.get("/add_quizzes", params={"size": 2})
+    assert quizzes.status_code == 200
+    # One keyset page of the seven seeded questions
+    assert len(set(re.findall(r"(?:Beginner|Intermediate|Advance) question \d", quizzes.text))) == 2
+
+
+def test_dashboard(admin):
+    response = admin.get("/dashboard")
+    assert response.status_code == 200
+    assert "learner" in response.text
+
+    search = admin.get("/dashboard", params={"q": "nobody"})
+    assert search.status_code == 200
+    assert "learner@example.com" not in search.text
+
+
+def test_profile(learner):
+    response = learner.get("/profile")
+    assert response.status_code == 200
+    assert 'value="learner"' in response.text
+
+
+def test_profile_requires_login(anon):
+    response = anon.get("/profile", follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"] == "/login"
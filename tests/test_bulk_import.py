@@ -0,0 +1,95 @@
+# tests/test_bulk_import.py
+#
+# Bulk lesson import (app/bulk.py) through POST /import_lessons: uploads that
+# cannot be read are reported like invalid rows, images from the zip get
+# their derivatives, and the import routes have a body limit of their own.
+
+import io
+import os
+import zipfile
+from typing import Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func, select
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+import app.bulk
+from app.database import SessionLocal
+from app.models import Lesson
+from app.storage import IMAGES_DIR, UploadSizeLimitMiddleware
+
+HEADER = "sign_level,name,image,heading,description\n"
+
+
+def lesson_count() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Lesson))
+
+
+def import_lessons(client, data: bytes, filename: str = "lessons.csv", images: Optional[bytes] = None):
+    files = {"file": (filename, data, "text/csv")}
+    if images is not None:
+        files["images"] = ("images.zip", images, "application/zip")
+    return client.post("/import_lessons", files=files)
+
+
+def test_non_utf8_upload_is_rejected(admin):
+    before = lesson_count()
+    data = (HEADER + "Basic,Caf\xe9,/static/images/cafe.png,Cafe,Coffee\n").encode("latin-1")
+    response = import_lessons(admin, data)
+    assert response.status_code == 400
+    assert "the file is not UTF-8 text" in response.text
+    assert lesson_count() == before
+
+
+def test_non_utf8_jsonl_upload_is_rejected(admin):
+    before = lesson_count()
+    response = import_lessons(admin, b'{"name": "\xff"}\n', filename="lessons.jsonl")
+    assert response.status_code == 400
+    assert "the file is not UTF-8 text" in response.text
+    assert lesson_count() == before
+
+
+def test_oversized_csv_field_is_rejected(admin):
+    before = lesson_count()
+    data = (HEADER + "Basic,Long,/static/images/long.png,Long," + "x" * 200_000 + "\n").encode()
+    response = import_lessons(admin, data)
+    assert response.status_code == 400
+    assert "the file is not valid CSV" in response.text
+    assert lesson_count() == before
+
+
+def test_zip_images_get_derivatives(admin, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(app.bulk, "schedule_derivatives", lambda *paths: scheduled.extend(paths))
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as images:
+        images.writestr("wave.png", b"bulk import test image")
+    data = (HEADER + "Basic,Zip wave,wave.png,Wave,Wave\nBasic,Zip wave again,wave.png,Wave,Wave\n").encode()
+
+    response = import_lessons(admin, data, images=archive.getvalue())
+    try:
+        assert response.status_code == 200, response.text
+        assert len(scheduled) == 1 and scheduled[0].startswith("/static/images/")
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(Lesson).where(Lesson.name.like("Zip wave%")))
+            db.commit()
+        for path in scheduled:
+            os.remove(os.path.join(IMAGES_DIR, os.path.basename(path)))
+
+
+def test_path_limits_override_the_body_limit():
+    async def ok(request):
+        await request.body()
+        return PlainTextResponse("ok")
+
+    inner = Starlette(routes=[Route("/upload", ok, methods=["POST"]), Route("/import", ok, methods=["POST"])])
+    client = TestClient(UploadSizeLimitMiddleware(inner, limit=100, path_limits={"/import": 1000}))
+    files = {"file": ("data.csv", b"x" * 500, "text/csv")}
+    assert client.post("/upload", files=files).status_code == 413
+    assert client.post("/import", files=files).status_code == 200
+    files = {"file": ("data.csv", b"x" * 2000, "text/csv")}
+    assert client.post("/import", files=files).status_code == 413